@@ -1,3 +1,76 @@
+import os
+
 RPC_API = ""
+# toncenter v3 base URL; point it at a local stand-in with the TONCENTER_API environment variable
+# (several comma-separated URLs form a pool sharing RPC_API and the rate limit below)
+TONCENTER_API = os.environ.get("TONCENTER_API", "https://toncenter.com/api/v3")
 DISPERSE_TON_AMOUNT = [1.01, 1.1]
-THREADS = 5
\ No newline at end of file
+THREADS = 5        # max concurrent read requests / read fan-out workers
+SEND_THREADS = 5   # max concurrent wallets sending transactions
+
+# Shared HTTP client used for every toncenter request
+HTTP_POOL_SIZE = 100      # max simultaneous open connections
+HTTP_KEEPALIVE = 30       # seconds an idle connection is kept for reuse
+HTTP_TIMEOUT = 15         # total seconds allowed per request
+
+# Client-side rate limit matching the RPC_API key (toncenter: 1 RPS without a key, 10 with a free key)
+RPC_RPS = 10
+RPC_BURST = 10
+RPC_MAX_429_RETRIES = 5   # times a request is retried after HTTP 429 before giving up
+
+# RPC endpoint pool; empty = TONCENTER_API with RPC_API, RPC_RPS and RPC_BURST.
+# Entries: {"url": "https://...", "api_key": "...", "rps": 10, "burst": 10}. Each request goes to the
+# healthy endpoint with the lowest smoothed latency plus rate-limit wait.
+RPC_ENDPOINTS = []
+RPC_HEDGE_DELAY = 0.5          # seconds a read waits before also asking a second endpoint; 0 = no hedging
+RPC_FAILURES_BEFORE_DOWN = 3   # consecutive errors or 5xx answers that take an endpoint out of rotation
+RPC_DOWN_SECONDS = 15          # first time out of rotation; doubles on every further failure, up to 5 minutes
+
+# Mnemonic-to-key derivation (PBKDF2) worker pool
+DERIVE_POOL = "process"   # "process" or "thread"
+DERIVE_WORKERS = 0        # 0 = one worker per CPU core
+
+# Seed generation, run in the derivation worker pool above
+GENERATE_BATCH_SIZE = 20       # seeds generated per worker task
+GENERATE_WITH_KEYS = False     # also derive each address: writes <file>.addresses.csv and pre-fills the key cache
+
+# Derived address/keypair cache stored next to the wallet file (<file>.keys.db)
+KEY_CACHE_ENABLED = True
+
+# Wallet file streaming: seeds are read, derived and queried one chunk at a time
+SEED_CHUNK_SIZE = 1000    # seeds per chunk
+SEED_FILE_MMAP = False    # read the wallet file through mmap instead of buffered reads
+
+# Addresses per batched walletStates request (keep the query string under ~8 KB)
+STATE_BATCH_SIZE = 100
+
+# Balance check output: a PrettyTable up to this many wallets, streamed fixed-width rows beyond it
+BALANCE_PRETTY_MAX_ROWS = 50
+BALANCE_PAGE_SIZE = 0     # pause after this many streamed rows when run in a terminal; 0 = no paging
+EXPORT_BATCH_SIZE = 10000 # rows buffered per write of a balances --export file (one Parquet row group)
+SNAPSHOT_DIFF_ROWS = 20   # largest balance changes listed after balances --snapshot / --refresh
+
+# Seconds a wallet's seqno seen on chain is reused for new messages instead of asking the network
+SEQNO_CACHE_TTL = 30
+
+# Seconds a wallet state read (balance, status, seqno) is reused by later reads of the same address;
+# our own sends drop the addresses they touch. 0 = no reuse (identical in-flight reads are still merged)
+STATE_CACHE_TTL = 5
+
+# Metrics in the Prometheus text format
+METRICS_PORT = 0               # serve http://127.0.0.1:<port>/metrics while the app runs; 0 = off
+METRICS_TEXTFILE = ""          # write all metrics to this file on exit (node_exporter textfile collector)
+METRICS_SUMMARY = False        # print per-endpoint request counts and p50/p95/p99 latency on exit
+
+# Highload wallet (v2) derived from the first seed, used as the funding wallet when enabled
+USE_HIGHLOAD_WALLET = False
+HIGHLOAD_BATCH_SIZE = 200      # transfers per highload message (max 254)
+HIGHLOAD_FUND_AMOUNT = 1.0     # TON sent from the main v4r2 wallet when setting up the highload wallet
+DEPLOY_FUND_AMOUNT = 0.01      # TON sent to each empty wallet before activation (highload mode only)
+
+# Profiling (main.py --profile)
+PROFILE_DIR = "profiles"          # one <time>_<command>/ directory per profiled run
+PROFILE_SAMPLE_INTERVAL = 0.005   # seconds between stack samples
+
+# Run journals (runs/<run id>.jsonl) for deploy, disperse and collect; resume with --resume <run id>
+JOURNAL_DIR = "runs"
@@ -0,0 +1 @@
+# Lets a plain `pytest` run import config and the src package from the repository root
@@ -4,12 +4,17 @@ TON Wallet Manager - Main Application
 A modular async wallet management system for TON blockchain
 """
 
+import argparse
 import asyncio
+import contextlib
+import json
+import os
+import sys
 from datetime import datetime
-from src.utils import generate_seeds
-from src.deploy import deploy_wallet
-from src.transfer import transfer_from_one_to_another, transfer_from_all_to_one
-from src.balance_checker import check_wallet_balances
+from typing import Any, Dict
+
+# Command modules (and tonsdk / aiohttp / prettytable behind them) are imported by the
+# command that needs them, so the menu and --help come up without paying for them.
 
 
 def display_menu():
@@ -22,6 +27,7 @@ def display_menu():
     print("3. Transfer from main to all wallets")
     print("4. Transfer from all wallets to main")
     print("5. Check wallet balances")
+    print("6. Deploy highload wallet (fund from first wallet)")
     print("0. Exit")
     print("="*50)
 
@@ -68,20 +74,29 @@ async def handle_option(option: str):
                     print("Please enter a valid number")
 
             # Generate seeds with chosen number and filename
+            from src.utils import generate_seeds
             await generate_seeds(num_seeds, filename)
             
         elif option == "2":
+            from src.deploy import deploy_wallet
             await deploy_wallet()
             
         elif option == "3":
+            from src.transfer import transfer_from_one_to_another
             await transfer_from_one_to_another()
             
         elif option == "4":
+            from src.transfer import transfer_from_all_to_one
             await transfer_from_all_to_one()
             
         elif option == "5":
+            from src.balance_checker import check_wallet_balances
             await check_wallet_balances()
             
+        elif option == "6":
+            from src.highload import deploy_highload_wallet
+            await deploy_highload_wallet()
+            
         elif option == "0":
             print("👋 Goodbye!")
             return False
@@ -98,18 +113,28 @@ async def handle_option(option: str):
     return True
 
 
-async def main():
+def profiling(name: str, enabled: bool):
+    """Async context that profiles the command it wraps when --profile is given"""
+    if not enabled:
+        return contextlib.nullcontext()
+    from src.profiler import CommandProfiler
+    return CommandProfiler(name)
+
+
+async def main(profile: bool = False):
     """Main application loop"""
     print("🚀 Starting TON Wallet Manager...")
+    start_metrics()
     
     try:
         while True:
             display_menu()
             
-            option = input("Select an option (0-5): ").strip()
+            option = input("Select an option (0-6): ").strip()
             
             # Handle the option
-            should_continue = await handle_option(option)
+            async with profiling(f"option{option}", profile and option != "0"):
+                should_continue = await handle_option(option)
             
             if not should_continue:
                 break
@@ -122,8 +147,142 @@ async def main():
     except Exception as e:
         print(f"\n💥 Fatal error: {str(e)}")
         print("Application will exit")
+    finally:
+        await shutdown()
+
+
+def start_metrics() -> None:
+    """Start the metrics exporters; the metrics module is light, unlike the command modules"""
+    from src.metrics import start_exporters
+    start_exporters()
+
+
+async def shutdown() -> None:
+    """Release whatever the commands that ran have opened; modules never imported have nothing to close"""
+    utils = sys.modules.get("src.utils")
+    if utils is not None:
+        await utils.close_http_client()
+        utils.shutdown_derive_pool()
+    key_cache = sys.modules.get("src.key_cache")
+    if key_cache is not None:
+        key_cache.close_key_cache()
+    metrics = sys.modules.get("src.metrics")
+    if metrics is not None:
+        metrics.finish_exporters()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line interface; without a subcommand the interactive menu starts"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--wallets", default="wallets.txt", help="wallet file to use (default: wallets.txt)")
+    common.add_argument("--threads", type=int, help="max concurrent read requests (overrides THREADS)")
+    common.add_argument("--send-threads", type=int, help="max concurrent sending wallets (overrides SEND_THREADS)")
+    common.add_argument("-y", "--yes", action="store_true", help="answer yes to every confirmation prompt")
+    common.add_argument("--json", action="store_true",
+                        help="print the result as JSON on stdout (balances: one line per wallet, then a summary); "
+                             "human-readable output goes to stderr")
+
+    parser = argparse.ArgumentParser(description="TON Wallet Manager")
+    parser.add_argument("--import-profile", action="store_true",
+                        help="report the import cost of every command and exit")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile each command (CPU, sampled stacks, allocations) into PROFILE_DIR")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    generate = commands.add_parser("generate", parents=[common], help="generate new seed phrases into --wallets")
+    generate.add_argument("count", type=int, help="number of seed phrases")
+    generate.add_argument("--words", type=int, default=24, help="words per seed phrase (default: 24)")
+    generate.add_argument("--with-keys", action="store_true", help="also write addresses and fill the key cache")
+
+    resumable = argparse.ArgumentParser(add_help=False)
+    resumable.add_argument("--resume", metavar="RUN_ID",
+                           help="continue an interrupted run from its journal in JOURNAL_DIR (its wallet file is reused)")
+
+    commands.add_parser("deploy", parents=[common, resumable], help="activate every wallet that holds funds")
+    commands.add_parser("disperse", parents=[common, resumable], help="send TON from the first wallet to all others")
+    commands.add_parser("collect", parents=[common, resumable], help="send TON from all wallets to the first one")
+    balances = commands.add_parser("balances", parents=[common], help="show balances of all wallets")
+    balances.add_argument("--top", type=int, default=0, metavar="N", help="only show the N largest balances")
+    balances.add_argument("--export", metavar="PATH",
+                          help="also write every row to PATH while scanning (.csv, .jsonl, .parquet or .arrow)")
+    balances.add_argument("--export-format", choices=["csv", "jsonl", "parquet", "arrow"],
+                          help="export format when PATH has another extension (parquet/arrow need pyarrow)")
+    balances.add_argument("--snapshot", action="store_true",
+                          help="save the balances to <wallets>.snapshots.db and show what changed since the last snapshot")
+    balances.add_argument("--refresh", action="store_true",
+                          help="like --snapshot, but only fetch wallets with a transaction since the last snapshot")
+    commands.add_parser("deploy-highload", parents=[common], help="fund and deploy the highload wallet")
+    return parser
+
+
+async def run_command(args: argparse.Namespace, output=None) -> Dict[str, Any]:
+    """Run one subcommand without the menu and return its result"""
+    from src.utils import set_concurrency
+
+    set_concurrency(args.threads, args.send_threads)
+    start_metrics()
+    try:
+        async with profiling(args.command, args.profile):
+            return await _dispatch(args, output)
+    finally:
+        await shutdown()
+
+
+async def _dispatch(args: argparse.Namespace, output=None) -> Dict[str, Any]:
+    """Call the function behind a subcommand"""
+    from src.utils import confirm
+
+    if args.command == "generate":
+        if args.count <= 0:
+            return {"success": False, "error": "count must be positive"}
+        if os.path.exists(args.wallets) and os.path.getsize(args.wallets) > 0:
+            if not confirm(f"This will overwrite {args.wallets}. Are you sure? (y/n): ", args.yes):
+                return {"success": False, "error": "Operation cancelled."}
+        from src.utils import generate_seeds
+        return await generate_seeds(args.count, args.wallets, args.words, with_keys=args.with_keys)
+    if args.command == "deploy":
+        from src.deploy import deploy_wallet
+        return await deploy_wallet(args.wallets, args.yes, args.resume)
+    if args.command == "disperse":
+        from src.transfer import transfer_from_one_to_another
+        return await transfer_from_one_to_another(args.wallets, args.yes, args.resume)
+    if args.command == "collect":
+        from src.transfer import transfer_from_all_to_one
+        return await transfer_from_all_to_one(args.wallets, args.yes, args.resume)
+    if args.command == "balances":
+        from src.balance_checker import check_wallet_balances
+        sink = (lambda record: print(json.dumps(record), file=output, flush=True)) if output else None
+        return await check_wallet_balances(args.wallets, sink, args.top, args.export, args.export_format,
+                                           args.snapshot, args.refresh)
+    if args.command == "deploy-highload":
+        from src.highload import deploy_highload_wallet
+        return await deploy_highload_wallet(args.wallets, args.yes)
+    return {"success": False, "error": f"Unknown command: {args.command}"}
+
+
+def run_headless(args: argparse.Namespace) -> int:
+    """Run a subcommand and return the process exit code"""
+    try:
+        if args.json:
+            output = sys.stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                result = asyncio.run(run_command(args, output))
+            print(json.dumps(result), flush=True)
+        else:
+            result = asyncio.run(run_command(args))
+    except KeyboardInterrupt:
+        print("\n⚠️ Operation cancelled by user", file=sys.stderr)
+        return 130
+    return 0 if result.get("success") else 1
 
 
 if __name__ == "__main__":
+    cli_args = build_parser().parse_args()
+    if cli_args.import_profile:
+        from src.import_profile import print_import_profile
+        print_import_profile()
+        sys.exit(0)
+    if cli_args.command:
+        sys.exit(run_headless(cli_args))
     # Run the async main function
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main(cli_args.profile)) 
\ No newline at end of file
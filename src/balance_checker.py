@@ -1,57 +1,251 @@
-import asyncio
-from prettytable import PrettyTable
-from .utils import load_seeds, create_wallet_from_seed, get_wallet_balance
+import heapq
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import BALANCE_PRETTY_MAX_ROWS, BALANCE_PAGE_SIZE, SNAPSHOT_DIFF_ROWS
+from .utils import load_first_seeds, iter_wallet_chunks, iter_wallet_states, command_error
 
 
-async def check_wallet_balances() -> None:
-    """Check balances of all wallets from wallets.txt"""
-    seeds = await load_seeds()
-    
-    if not seeds:
-        print("No seeds found in wallets.txt")
-        return
-    
-    # Create PrettyTable with required columns
+def _new_balance_table():
+    """Create PrettyTable with required columns"""
+    from prettytable import PrettyTable
+
     table = PrettyTable()
     table.field_names = ["#", "Address (v4r2)", "Balance (TON)", "Status"]
     table.align["#"] = "r"
     table.align["Address (v4r2)"] = "l"
     table.align["Balance (TON)"] = "r"
     table.align["Status"] = "c"
+    return table
+
+
+class BalanceView:
+    """Console output of a balance scan.
+
+    Small scans get a PrettyTable; larger ones stream fixed-width rows as results arrive
+    (optionally paged), and top > 0 keeps only the largest balances for one table at the end.
+    """
+
+    ROW_FORMAT = "{:>7}  {:<48}  {:>16}  {}"
+
+    def __init__(self, top: int = 0, page_size: int = BALANCE_PAGE_SIZE, pretty_max_rows: int = BALANCE_PRETTY_MAX_ROWS):
+        self.top = top
+        self.page_size = page_size if sys.stdin.isatty() and sys.stdout.isatty() else 0
+        self.pretty_max_rows = pretty_max_rows
+        self._buffered: Optional[List[tuple]] = []  # None once streaming has started
+        self._largest: List[Tuple[float, int, tuple]] = []
+        self._printed = 0
+        self._muted = False
+
+    def add(self, row: tuple, balance: Optional[float]) -> None:
+        if self.top:
+            if balance is not None:
+                entry = (balance, -row[0], row)
+                if len(self._largest) < self.top:
+                    heapq.heappush(self._largest, entry)
+                elif entry > self._largest[0]:
+                    heapq.heapreplace(self._largest, entry)
+            return
+        if self._buffered is not None:
+            self._buffered.append(row)
+            if len(self._buffered) > self.pretty_max_rows:
+                rows, self._buffered = self._buffered, None
+                self._stream(rows)
+            return
+        self._stream([row])
+
+    def progress(self, checked: int) -> None:
+        """Progress line for the top-N view, which prints no rows while scanning"""
+        if self.top:
+            print(f"\rChecked {checked} wallets...", end="", flush=True)
+
+    def _stream(self, rows: List[tuple]) -> None:
+        for row in rows:
+            if self._muted:
+                return
+            if self._printed % (self.page_size or sys.maxsize) == 0:
+                if self._printed and not self._page_break():
+                    return
+                print(self.ROW_FORMAT.format("#", "Address (v4r2)", "Balance (TON)", "Status"))
+            print(self.ROW_FORMAT.format(*row))
+            self._printed += 1
+        sys.stdout.flush()
+
+    def _page_break(self) -> bool:
+        """Wait for the user between pages; q skips the remaining rows (the scan itself continues)"""
+        try:
+            answer = input(f"-- {self._printed} rows shown: Enter for more, q to skip to the summary -- ")
+        except EOFError:
+            answer = "q"
+        self._muted = answer.strip().lower() == "q"
+        return not self._muted
+
+    def finish(self) -> None:
+        if self.top:
+            print()
+            table = _new_balance_table()
+            for _balance, _index, row in sorted(self._largest, reverse=True):
+                table.add_row(row)
+            print(f"Top {len(self._largest)} balances:")
+            print(table)
+        elif self._buffered is not None:
+            table = _new_balance_table()
+            for row in self._buffered:
+                table.add_row(row)
+            print(table)
+
+
+async def check_wallet_balances(wallets_file: str = "wallets.txt",
+                                record_sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                top: int = 0, export_path: Optional[str] = None,
+                                export_format: Optional[str] = None, snapshot: bool = False,
+                                refresh: bool = False) -> Dict[str, Any]:
+    """Check balances of all wallets from wallets.txt; with record_sink, rows go there as dicts instead of tables.
+
+    export_path additionally writes every row to a CSV, JSONL, Parquet or Arrow file while scanning.
+    snapshot stores the states in <wallets_file>.snapshots.db and prints what changed since the last one;
+    refresh also uses the stored states to fetch only the wallets with a new transaction.
+    success is false when any wallet could not be derived or looked up; failed counts those rows.
+    """
+    if not await load_first_seeds(1, wallets_file):
+        return command_error(f"No seeds found in {wallets_file}")
     
-    print(f"Checking {len(seeds)} wallets...")
-    
-    # Process wallets concurrently for better performance
-    tasks = []
-    for i, seed in enumerate(seeds, 1):
-        tasks.append(_check_single_wallet(i, seed))
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    exporter = None
+    if export_path:
+        from .exporters import open_exporter
+        try:
+            exporter = open_exporter(export_path, export_format)
+        except (OSError, ValueError, RuntimeError) as e:
+            return command_error(f"❌ {e}")
     
-    # Add results to table
-    for result in results:
-        if isinstance(result, Exception):
-            table.add_row([
-                "?",
-                "Error processing wallet",
-                "Error", 
-                f"Error: {str(result)[:20]}..."
-            ])
-        else:
-            table.add_row(result)
+    store = None
+    snapshot_id = None
+    completed = False
+    try:
+        if snapshot or refresh:
+            from .snapshots import open_snapshot_store, print_snapshot_diff
+            store = open_snapshot_store(wallets_file)
+            previous = store.latest()
+            snapshot_id = store.begin(refresh)
+        
+        print(f"Checking wallets from {wallets_file}...")
+        print("\nWallet Balances:")
+        
+        # Stream the file: derive one chunk in the worker pool, then show each state batch as soon as it arrives
+        view = BalanceView(top) if record_sink is None else None
+        checked = 0
+        active = 0
+        total_balance = 0
+        changed = 0
+        fetched = 0
+        failed = 0
+        async for chunk in iter_wallet_chunks(return_exceptions=True, path=wallets_file):
+            underived = [(index, wallet) for index, wallet in chunk if isinstance(wallet, Exception)]
+            derived = [(index, wallet) for index, wallet in chunk if not isinstance(wallet, Exception)]
+            failed += len(underived)
+            for index, wallet in underived:
+                if exporter is not None:
+                    exporter.write(_export_row(index + 1, wallet, None))
+                if record_sink is not None:
+                    record_sink(_balance_record(index + 1, wallet, None))
+                else:
+                    view.add(_check_single_wallet(index + 1, wallet, {}), None)
+            
+            addresses = [wallet[0] for _, wallet in derived]
+            known = store.get_many(addresses) if store is not None else {}
+            position = 0
+            async for batch, states in iter_wallet_states(addresses, known if refresh else None):
+                snapshot_rows = []
+                for index, wallet in derived[position:position + len(batch)]:
+                    state = states[wallet[0]]
+                    if state["success"]:
+                        total_balance += state["balance_ton"]
+                        active += state["status"] == "active"
+                        fetched += not state.get("cached")
+                        snapshot_rows.append((index + 1, wallet[0], state))
+                    else:
+                        failed += 1
+                    if exporter is not None:
+                        exporter.write(_export_row(index + 1, wallet, state))
+                    if record_sink is not None:
+                        record_sink(_balance_record(index + 1, wallet, state))
+                    else:
+                        view.add(_check_single_wallet(index + 1, wallet, states), state["balance_ton"] if state["success"] else None)
+                position += len(batch)
+                if store is not None:
+                    changed += store.record(snapshot_id, snapshot_rows, known, previous is not None)
+            checked += len(chunk)
+            if view is not None:
+                view.progress(checked)
+        completed = True
+    finally:
+        # A scan cut short by an error or Ctrl+C leaves neither a partial export nor a half-taken snapshot
+        if not completed:
+            if exporter is not None:
+                exporter.abort()
+            if store is not None:
+                if snapshot_id is not None:
+                    store.abort(snapshot_id)
+                store.close()
     
-    print("\nWallet Balances:")
-    print(table)
+    if view is not None:
+        view.finish()
+    print(f"Checked {checked} wallets.")
+    if failed:
+        print(f"⚠️ {failed} wallet lookup(s) failed")
+    result = {"success": failed == 0, "checked": checked, "failed": failed, "active": active,
+              "total_balance": round(total_balance, 9)}
+    if exporter is not None:
+        exporter.close()
+        print(f"📤 Exported {exporter.rows_written} rows to {export_path}")
+        result["exported"] = export_path
+    if store is not None:
+        store.finish(snapshot_id, checked, changed)
+        if refresh:
+            print(f"🔄 Fetched full state for {fetched} wallet(s), the rest had no new transactions")
+        print_snapshot_diff(store, snapshot_id, previous[1] if previous else None, changed, SNAPSHOT_DIFF_ROWS)
+        store.close()
+        result.update(snapshot=snapshot_id, changed=changed, fetched=fetched)
+    return result
+
+
+def _export_row(wallet_num: int, wallet: Any, state: Optional[Dict]) -> Dict[str, Any]:
+    """Export form of one balance row: integer nanotons, null fields where the lookup failed"""
+    row = {"index": wallet_num, "address": None, "balance_nano": None, "status": "error",
+           "seqno": None, "last_transaction_lt": None}
+    if not isinstance(wallet, Exception):
+        row["address"] = wallet[0]
+    if state is not None and state["success"]:
+        lt = state["last_transaction_lt"]
+        row.update(balance_nano=int(state["balance_nano"]), status=state["status"], seqno=state["seqno"],
+                   last_transaction_lt=int(lt) if lt is not None else None)
+    return row
+
+
+def _balance_record(wallet_num: int, wallet: Any, state: Optional[Dict]) -> Dict[str, Any]:
+    """Machine-readable form of one balance row"""
+    if isinstance(wallet, Exception):
+        return {"index": wallet_num, "address": None, "error": str(wallet)}
+    if not state["success"]:
+        return {"index": wallet_num, "address": wallet[0], "error": state["error"]}
+    return {
+        "index": wallet_num,
+        "address": wallet[0],
+        "balance_ton": state["balance_ton"],
+        "status": state["status"],
+        "seqno": state["seqno"]
+    }
 
 
-async def _check_single_wallet(wallet_num: int, seed: str) -> tuple:
-    """Check balance for a single wallet"""
+def _check_single_wallet(wallet_num: int, wallet: tuple, states: dict) -> tuple:
+    """Build the table row for a single derived wallet"""
     try:
-        # Create wallet from seed
-        address, wallet = await create_wallet_from_seed(seed)
+        # Derivation errors are passed through from the worker pool
+        if isinstance(wallet, Exception):
+            raise wallet
+        address, _ = wallet
         
         # Get balance
-        balance_info = await get_wallet_balance(address)
+        balance_info = states[address]
         
         if balance_info["success"]:
             balance_ton = balance_info["balance_ton"]
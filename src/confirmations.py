@@ -0,0 +1,79 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional
+from .utils import get_transactions_by_message, invalidate_states
+from .metrics import record_confirmation
+
+
+class ConfirmationWatcher:
+    """Single poller that confirms every pending message hash with batched queries"""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._messages: Dict[str, List[asyncio.Future]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        """Poll all watched messages together until nothing is pending"""
+        while self._messages:
+            await asyncio.sleep(self.interval)
+            hashes = list(self._messages)
+            transactions = await get_transactions_by_message(hashes)
+            for message_hash in hashes:
+                result = transactions.get(message_hash)
+                if result is None or not result["success"] or result["transaction"] is None:
+                    continue
+                for future in self._messages.get(message_hash, []):
+                    if not future.done():
+                        future.set_result(result["transaction"])
+
+    async def wait_for_message(self, message_hash: str, timeout: float = 60) -> Optional[Dict]:
+        """Resolve with the transaction created by a sent message (see utils._transaction_info), None on timeout"""
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._messages.setdefault(message_hash, [])
+        waiters.append(future)
+        self._ensure_running()
+        started = time.perf_counter()
+        transaction = None
+        try:
+            transaction = await asyncio.wait_for(future, timeout)
+            return transaction
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            record_confirmation("message", transaction is not None, time.perf_counter() - started)
+            waiters.remove(future)
+            if not waiters and self._messages.get(message_hash) is waiters:
+                del self._messages[message_hash]
+
+
+confirmation_watcher = ConfirmationWatcher()
+
+
+async def await_message(message_hash: str, timeout: int = 60, affected: Iterable[str] = ()) -> Optional[Dict]:
+    """Waits for the transaction of a sent message; returns its hash, success flag, fees and bounce status.
+
+    Cached states of the affected addresses are dropped again once it lands, as reads while it was
+    pending may have cached the old state.
+    """
+    transaction = await confirmation_watcher.wait_for_message(message_hash, timeout)
+    if transaction is not None:
+        invalidate_states(affected)
+    else:
+        print(f"  ⏳ Timeout waiting for transaction confirmation.")
+    return transaction
+
+
+def describe_failure(transaction: Dict) -> str:
+    """Short reason for a transaction that landed but did not succeed"""
+    if transaction["bounced"]:
+        reason = "bounced"
+    elif transaction["exit_code"] not in (None, 0, 1):
+        reason = f"exit code {transaction['exit_code']}"
+    else:
+        reason = "action phase failed, e.g. not enough balance"
+    return f"Transaction failed ({reason}): {transaction['explorer_link']}"
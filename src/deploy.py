@@ -1,14 +1,19 @@
 import asyncio
+import math
 import random
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from config import USE_HIGHLOAD_WALLET, DEPLOY_FUND_AMOUNT
 from .utils import (
-    load_seeds, create_wallet_from_seed, get_wallet_balance,
-    get_wallet_seqno, send_transaction_boc, create_transfer_transaction,
-    generate_random_address, await_seqno_increment
+    load_first_seeds, iter_wallet_chunks, create_wallet_from_seed, get_wallet_balance, get_wallet_states,
+    get_wallet_seqno, seqno_tracker, send_transaction_boc, invalidate_states, create_transfer_transaction,
+    generate_random_address, SignedMessage, run_bounded, send_limit, confirm, command_error
 )
+from .confirmations import await_message, describe_failure
+from .highload import create_highload_wallet, send_highload_transfers, highload_batch_size
+from .journal import RunJournal, resume_run, resolve_in_doubt
 
 
-async def _activate_single_wallet(wallet_info: Dict[str, Any]) -> Dict[str, Any]:
+async def _activate_single_wallet(wallet_info: Dict[str, Any], journal: RunJournal) -> Dict[str, Any]:
     """Handles the activation logic for a single wallet."""
     try:
         print(f"\nProcessing activation for wallet #{wallet_info['index']}: {wallet_info['address']}")
@@ -23,45 +28,79 @@ async def _activate_single_wallet(wallet_info: Dict[str, Any]) -> Dict[str, Any]
         
         max_retries = 3
         last_error = "Unknown error"
+        signed = None
+        fresh_seqno = False
 
         for attempt in range(max_retries):
             try:
-                seqno_result = await get_wallet_seqno(wallet_info["address"])
-                if not seqno_result["success"]:
-                    last_error = f"Failed to get seqno: {seqno_result.get('error', 'N/A')}"
-                    await asyncio.sleep(1)
-                    continue
-                
-                seqno = seqno_result["seqno"]
-                if seqno > 0:
-                    print("  ✅ Wallet is already active (seqno > 0).")
-                    return {"success": True, "activated": False, "message": "Already active"}
-
-                random_address = await generate_random_address()
-                dust_amount = random.uniform(0.000000001, 0.00000001)
-
-                boc = await create_transfer_transaction(
-                    wallet_info["wallet"], random_address, dust_amount, seqno
-                )
-                
-                send_result = await send_transaction_boc(boc)
-                
-                if send_result["success"]:
-                    print(f"  ✅ Activation transaction sent! Waiting for confirmation...")
-                    print(f"  💳 Transaction: {send_result.get('explorer_link', 'N/A')}")
-
-                    confirmed = await await_seqno_increment(wallet_info["address"], seqno)
-                    if confirmed:
+                transaction = None
+                if signed is not None:
+                    # A retry looks the signed message up by hash; a seqno 0 message never expires
+                    check = await signed.recheck()
+                    if not check["success"]:
+                        last_error = f"Failed to look up the previous attempt: {check.get('error', 'N/A')}"
+                        await asyncio.sleep(1)
+                        continue
+                    if check["state"] == "included":
+                        print("  🎉 Activation from a previous attempt landed!")
+                        transaction = check["transaction"]
+                        invalidate_states([wallet_info["address"]])
+
+                if transaction is None:
+                    if signed is None:
+                        seqno_result = await (get_wallet_seqno(wallet_info["address"]) if fresh_seqno
+                                              else seqno_tracker.next_seqno(wallet_info["address"]))
+                        if not seqno_result["success"]:
+                            last_error = f"Failed to get seqno: {seqno_result.get('error', 'N/A')}"
+                            await asyncio.sleep(1)
+                            continue
+
+                        if seqno_result["seqno"] > 0:
+                            print("  ✅ Wallet is already active (seqno > 0).")
+                            journal.confirmed("activate", [wallet_info["address"]], already_active=True)
+                            return {"success": True, "activated": False, "message": "Already active"}
+
+                        random_address = await generate_random_address()
+                        dust_amount = random.uniform(0.000000001, 0.00000001)
+
+                        boc = await create_transfer_transaction(
+                            wallet_info["wallet"], random_address, dust_amount, 0
+                        )
+                        signed = SignedMessage(wallet_info["address"], 0, boc)
+                        journal.sent("activate", [wallet_info["address"]], wallet_info["address"],
+                                     seqno=0, message_hash=signed.hash)
+
+                    send_result = await send_transaction_boc(signed.boc, [wallet_info["address"]])
+                    signed.record_send(send_result)
+                    if send_result["success"]:
+                        print(f"  ✅ Activation transaction sent! Waiting for confirmation...")
+                        transaction = await await_message(signed.hash, affected=[wallet_info["address"]])
+                        if transaction is None:
+                            last_error = "Confirmation timeout"
+                            seqno_tracker.forget(wallet_info["address"])
+                            print("  ❌ Activation sent but confirmation timed out.")
+                            break
+                    else:
+                        last_error = send_result.get('error', 'Unknown send error')
+                        seqno_tracker.forget(wallet_info["address"])
+                        if signed.refused:
+                            # Only seqno 0 is ever signed here, so a new message cannot land twice;
+                            # a wallet that is active by now is caught by the seqno check
+                            signed = None
+                            fresh_seqno = True
+                        print(f"  Attempt {attempt + 1}/{max_retries} failed: {last_error}")
+
+                if transaction is not None:
+                    signed.landed()
+                    if transaction["success"]:
                         print("  🎉 Wallet successfully activated!")
+                        print(f"  💳 Transaction: {transaction['explorer_link']}")
+                        journal.confirmed("activate", [wallet_info["address"]], tx_hash=transaction["hash"])
                         return {"success": True, "activated": True}
-                    else:
-                        last_error = "Confirmation timeout"
-                        print("  ❌ Activation sent but confirmation timed out.")
-                    
+                    last_error = describe_failure(transaction)
+                    journal.failed("activate", [wallet_info["address"]], last_error)
+                    print("  ❌ Activation landed but failed.")
                     break
-                else:
-                    last_error = send_result.get('error', 'Unknown send error')
-                    print(f"  Attempt {attempt + 1}/{max_retries} failed: {last_error}")
 
             except Exception as tx_error:
                 last_error = f"Exception during activation attempt: {str(tx_error)}"
@@ -79,100 +118,176 @@ async def _activate_single_wallet(wallet_info: Dict[str, Any]) -> Dict[str, Any]
         return {"success": False, "error": error_msg}
 
 
-async def deploy_wallet() -> None:
-    """Deploy wallets by sending small amounts to activate them"""
-    seeds = await load_seeds()
-    
-    if not seeds:
-        print("No seeds found in wallets.txt")
-        return
-        
-    if len(seeds) < 2:
-        print("Need at least 2 wallets for deployment (first as funding wallet)")
-        return
-    
-    main_seed = seeds[0]
-    main_address, _ = await create_wallet_from_seed(main_seed)
-    
-    print(f"Funding wallet address: {main_address}")
-    
-    main_balance_info = await get_wallet_balance(main_address)
-    if not main_balance_info["success"]:
-        print(f"Error getting funding wallet balance: {main_balance_info['error']}")
-        return
-    
-    main_balance = main_balance_info["balance_ton"]
-    print(f"Funding wallet balance: {main_balance:.4f} TON")
-    
-    if main_balance_info["status"] != "active":
-        print("Funding wallet is not active! Cannot deploy other wallets.")
-        return
-    
+async def _await_funds(addresses: List[str], timeout: int = 60) -> None:
+    """Waits until freshly funded wallets show a non-zero balance."""
+    pending = set(addresses)
+    start_time = asyncio.get_event_loop().time()
+    while pending and asyncio.get_event_loop().time() - start_time < timeout:
+        states = await get_wallet_states(list(pending), fresh=True)
+        pending = {address for address, state in states.items() if not state["success"] or state["balance_ton"] <= 0}
+        if pending:
+            await asyncio.sleep(2)
+
+
+async def _plan_deploy_chunk(chunk: List[Tuple[int, Any]], verbose: bool,
+                            journal: Optional[RunJournal] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Query one chunk of wallets and split the inactive ones into (funded, needs funding first).
+
+    Wallets the journal has settled are left out, and so is funding that is already on its way.
+    """
+    if journal is not None:
+        chunk = [item for item in chunk if not journal.is_settled("activate", item[1][0])]
+    states = await get_wallet_states([address for _index, (address, _wallet) in chunk])
     wallets_to_deploy = []
-    
-    print(f"\nChecking wallets to deploy ({len(seeds) - 1} wallets):")
-    
-    for i, seed in enumerate(seeds[1:], 1):
-        address, wallet = await create_wallet_from_seed(seed)
-        
-        balance_info = await get_wallet_balance(address)
+    wallets_to_fund = []
+
+    for i, (address, wallet) in chunk:
+        balance_info = states[address]
         if balance_info["success"]:
             status = balance_info["status"]
             balance = balance_info["balance_ton"]
-            
+            wallet_info = {"wallet": wallet, "address": address, "index": i}
+
             if status == "active":
-                print(f"Wallet #{i}: {address}")
-                print(f"  → Already active (balance: {balance:.6f} TON)")
+                message = f"  → Already active (balance: {balance:.6f} TON)"
             elif balance > 0:
-                 wallets_to_deploy.append({
-                    "wallet": wallet,
-                    "address": address,
-                    "index": i
-                })
-                 print(f"Wallet #{i}: {address}")
-                 print(f"  → Needs deployment (status: {status}, balance: {balance:.6f} TON)")
+                wallets_to_deploy.append(wallet_info)
+                message = f"  → Needs deployment (status: {status}, balance: {balance:.6f} TON)"
+            elif journal is not None and journal.is_settled("fund", address):
+                message = f"  → Funding already sent by this run, waiting for it to arrive"
+            elif USE_HIGHLOAD_WALLET:
+                wallets_to_fund.append(wallet_info)
+                message = f"  → Needs deployment, will be funded with {DEPLOY_FUND_AMOUNT:.4f} TON first"
             else:
-                print(f"Wallet #{i}: {address}")
-                print(f"  → Needs deployment but has 0 TON. Please fund first.")
+                message = f"  → Needs deployment but has 0 TON. Please fund first."
         else:
+            message = f"  → Error checking status: {balance_info['error']}"
+
+        if verbose:
             print(f"Wallet #{i}: {address}")
-            print(f"  → Error checking status: {balance_info['error']}")
-    
-    if not wallets_to_deploy:
+            print(message)
+
+    return wallets_to_deploy, wallets_to_fund
+
+
+async def deploy_wallet(wallets_file: str = "wallets.txt", auto_confirm: bool = False,
+                        run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Deploy wallets by sending small amounts to activate them; run_id resumes an interrupted run"""
+    journal = None
+    if run_id:
+        try:
+            journal = resume_run("deploy", run_id)
+        except (OSError, ValueError) as e:
+            return command_error(f"❌ {e}")
+        wallets_file = journal.params["wallets_file"]
+
+    seeds = await load_first_seeds(2, wallets_file)
+
+    if not seeds:
+        return command_error(f"No seeds found in {wallets_file}")
+
+    if len(seeds) < 2:
+        return command_error("Need at least 2 wallets for deployment (first as funding wallet)")
+
+    if USE_HIGHLOAD_WALLET:
+        main_address, main_wallet = await create_highload_wallet(seeds[0])
+        print("Using the highload wallet as the funding wallet")
+    else:
+        main_address, main_wallet = await create_wallet_from_seed(seeds[0])
+
+    print(f"Funding wallet address: {main_address}")
+
+    main_balance_info = await get_wallet_balance(main_address)
+    if not main_balance_info["success"]:
+        return command_error(f"Error getting funding wallet balance: {main_balance_info['error']}")
+
+    main_balance = main_balance_info["balance_ton"]
+    print(f"Funding wallet balance: {main_balance:.4f} TON")
+
+    if main_balance_info["status"] != "active":
+        return command_error("Funding wallet is not active! Cannot deploy other wallets.")
+
+    if journal is not None:
+        await resolve_in_doubt(journal)
+
+    deploy_count = 0
+    fund_count = 0
+    fund_batches = 0
+
+    print(f"\nChecking wallets to deploy:")
+
+    # Scan the file once to show the plan; states are re-read chunk by chunk when activating
+    async for chunk in iter_wallet_chunks(start=1, path=wallets_file):
+        wallets_to_deploy, wallets_to_fund = await _plan_deploy_chunk(chunk, True, journal)
+        deploy_count += len(wallets_to_deploy)
+        fund_count += len(wallets_to_fund)
+        fund_batches += math.ceil(len(wallets_to_fund) / highload_batch_size())
+
+    if not deploy_count and not fund_count:
         print("\n✅ No wallets need activation!")
-        return
-    
+        result = {"success": True, "to_activate": 0, "activated": 0}
+        if journal is not None:
+            journal.finish(result)
+            journal.close()
+        return result
+
+    total_to_activate = deploy_count + fund_count
+
     print(f"\n📋 Activation Summary:")
     print("=" * 50)
-    for wallet_info in wallets_to_deploy:
-        print(f"Wallet #{wallet_info['index']}: Needs activation → {wallet_info['address'][:10]}...{wallet_info['address'][-6:]}")
-    print("=" * 50)
-    print(f"✅ Wallets to activate: {len(wallets_to_deploy)}")
+    print(f"✅ Wallets to activate: {total_to_activate}")
+    if fund_count:
+        print(f"💸 Wallets to fund first: {fund_count}")
+        print(f"💰 Total to fund: {DEPLOY_FUND_AMOUNT * fund_count:.4f} TON")
     print(f"💳 Funding wallet balance: {main_balance:.4f} TON")
     print("=" * 50)
-    
+
     if main_balance < 0.01:
         print(f"\n⚠️ Funding wallet balance is very low. Please ensure it's funded.")
 
-    proceed = input("Proceed with wallet activation? (y/n): ").lower().strip()
-    if proceed != 'y':
-        print("Activation cancelled.")
-        return
-    
+    if not confirm("Proceed with wallet activation? (y/n): ", auto_confirm):
+        return command_error("Activation cancelled.")
+
+    if journal is None:
+        journal = RunJournal.create("deploy", wallets_file=wallets_file, highload=USE_HIGHLOAD_WALLET)
+
     print("\n🚀 Starting wallet activation concurrently...")
-    
-    tasks = [_activate_single_wallet(wallet_info) for wallet_info in wallets_to_deploy]
-    results = await asyncio.gather(*tasks)
-    
-    successful_activations = sum(1 for r in results if r.get("success") and r.get("activated"))
-    
+
+    successful_activations = 0
+    any_success = False
+    batch_offset = 0
+    async for chunk in iter_wallet_chunks(start=1, path=wallets_file):
+        wallets_to_deploy, wallets_to_fund = await _plan_deploy_chunk(chunk, False, journal)
+
+        if wallets_to_fund:
+            print(f"\n💸 Funding {len(wallets_to_fund)} empty wallets from the highload wallet...")
+            funding = [(w["address"], DEPLOY_FUND_AMOUNT) for w in wallets_to_fund]
+            journal.planned("fund", funding)
+            fund_result = await send_highload_transfers(
+                main_wallet, main_address, funding, batch_offset, fund_batches, journal=journal, op="fund"
+            )
+            batch_offset += math.ceil(len(wallets_to_fund) / highload_batch_size())
+            funded = set(fund_result["confirmed_addresses"])
+            await _await_funds(list(funded))
+            wallets_to_deploy.extend(w for w in wallets_to_fund if w["address"] in funded)
+
+        journal.planned("activate", [(w["address"], None) for w in wallets_to_deploy])
+        results = await run_bounded(lambda w: _activate_single_wallet(w, journal), wallets_to_deploy, send_limit.limit)
+        successful_activations += sum(1 for r in results if r.get("success") and r.get("activated"))
+        any_success = any_success or any(r.get("success") for r in results)
+
     print(f"\n📊 Activation Summary:")
-    print(f"Successfully activated: {successful_activations}/{len(wallets_to_deploy)}")
-    
+    print(f"Successfully activated: {successful_activations}/{total_to_activate}")
+
     if successful_activations > 0:
         print("🎉 Activation process completed!")
         print("💡 Note: It may take a few minutes for all wallets to show as 'active' in all explorers.")
-    elif any(r.get("success") for r in results):
+    elif any_success:
         print("✅ No new activations needed. Some wallets were already active.")
     else:
         print("❌ No wallets were successfully activated.")
+
+    result = {"success": successful_activations > 0 or any_success, "to_activate": total_to_activate, "activated": successful_activations}
+    journal.finish(result)
+    journal.close()
+    return result
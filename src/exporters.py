@@ -0,0 +1,126 @@
+import abc
+import csv
+import json
+import os
+from typing import Any, Dict, List, Optional
+from config import EXPORT_BATCH_SIZE
+
+
+EXPORT_FIELDS = ["index", "address", "balance_nano", "status", "seqno", "last_transaction_lt"]
+EXPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+
+class _BatchedExporter(abc.ABC):
+    """Collects rows and writes them EXPORT_BATCH_SIZE at a time, so an export never sits whole in memory"""
+
+    def __init__(self, path: str, batch_size: int = EXPORT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._rows: List[Dict[str, Any]] = []
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            self._write_batch(self._rows)
+            self.rows_written += len(self._rows)
+            self._rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self._close()
+
+    def abort(self) -> None:
+        """Drop an unfinished export: close the file and remove it, so no partial export is left behind"""
+        self._rows = []
+        self._close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @abc.abstractmethod
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        ...
+
+    @abc.abstractmethod
+    def _close(self) -> None:
+        ...
+
+
+class CsvExporter(_BatchedExporter):
+    def __init__(self, path: str, batch_size: int = EXPORT_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self._file = open(path, "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=EXPORT_FIELDS)
+        self._writer.writeheader()
+
+    def _write_batch(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlExporter(_BatchedExporter):
+    def __init__(self, path: str, batch_size: int = EXPORT_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self._file = open(path, "w")
+
+    def _write_batch(self, rows):
+        self._file.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows))
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ArrowExporter(_BatchedExporter):
+    """Parquet (one row group per batch) or Arrow IPC file; needs the optional pyarrow package"""
+
+    def __init__(self, path: str, file_format: str, batch_size: int = EXPORT_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError(f"{file_format} export needs pyarrow: pip install pyarrow")
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("index", pa.int64()),
+            ("address", pa.string()),
+            ("balance_nano", pa.int64()),
+            ("status", pa.string()),
+            ("seqno", pa.int64()),
+            ("last_transaction_lt", pa.int64()),
+        ])
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self._schema)
+        else:
+            import pyarrow.ipc
+            self._writer = pa.ipc.new_file(path, self._schema)
+
+    def _write_batch(self, rows):
+        columns = {name: [row[name] for row in rows] for name in EXPORT_FIELDS}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+def open_exporter(path: str, file_format: Optional[str] = None) -> _BatchedExporter:
+    """Open an exporter for path; the format comes from the file extension unless given"""
+    file_format = file_format or EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format == "csv":
+        return CsvExporter(path)
+    if file_format == "jsonl":
+        return JsonlExporter(path)
+    if file_format in ("parquet", "arrow"):
+        return ArrowExporter(path, file_format)
+    raise ValueError(f"Cannot tell the export format of {path}; use .csv, .jsonl, .parquet or .arrow")
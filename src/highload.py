@@ -0,0 +1,247 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from tonsdk.contract.wallet import HighloadWalletV2Contract
+from tonsdk.boc import Cell
+from tonsdk.utils import bytes_to_b64str, crc32c
+from config import HIGHLOAD_BATCH_SIZE, HIGHLOAD_FUND_AMOUNT
+from .utils import (
+    load_first_seeds, derive_keys, create_wallet_from_seed, get_wallet_balance,
+    get_wallet_seqno, send_transaction_boc, create_transfer_transaction, api_request, confirm, command_error,
+    message_hash
+)
+from .confirmations import await_message, describe_failure
+
+
+# The highload v2 contract keeps orders in a 16-bit dict and TVM allows 255 actions
+HIGHLOAD_MAX_MESSAGES = 254
+
+_query_counter = itertools.count()
+
+
+async def create_highload_wallet(seed: str) -> Tuple[str, object]:
+    """Create the highload wallet that shares its keypair with a seed; return address and wallet object"""
+    _address, pub_k, priv_k = (await derive_keys([seed]))[0]
+    wallet = HighloadWalletV2Contract(public_key=pub_k, private_key=priv_k, wc=0)
+    address = wallet.address.to_string(True, True, False)
+    return address, wallet
+
+
+def cell_to_boc(cell: Cell) -> bytes:
+    """Serialize a cell tree to a BOC without an index, with CRC32C.
+
+    tonsdk writes each reference with the fewest bytes its index needs, which
+    breaks BOCs of more than 255 cells such as a full highload batch.
+    """
+    topological_order, cells_index = cell.tree_walk()
+    cells_num = len(topological_order)
+    ref_size = max((cells_num.bit_length() + 7) // 8, 1)
+
+    payload = b""
+    for _hash, subcell in topological_order:
+        payload += bytes(subcell.get_data_with_descriptors())
+        for ref in subcell.refs:
+            payload += cells_index[ref.bytes_hash()].to_bytes(ref_size, "big")
+    offset_size = max((len(payload).bit_length() + 7) // 8, 1)
+
+    boc = bytes.fromhex("b5ee9c72")
+    boc += bytes([0x40 | ref_size, offset_size])  # has_crc32c flag + ref size
+    boc += cells_num.to_bytes(ref_size, "big")
+    boc += (1).to_bytes(ref_size, "big")  # one root
+    boc += (0).to_bytes(ref_size, "big")  # no absent cells
+    boc += len(payload).to_bytes(offset_size, "big")
+    boc += (0).to_bytes(ref_size, "big")  # root index
+    boc += payload
+    return boc + crc32c(boc)
+
+
+def next_query_id(timeout: int = 60) -> int:
+    """Return a unique query id; its upper 32 bits are the time after which the contract rejects it"""
+    return ((int(time.time()) + timeout) << 32) | (next(_query_counter) & 0xFFFFFFFF)
+
+
+async def create_highload_transaction(wallet, transfers: List[Tuple[str, float]], query_id: int) -> str:
+    """Create one highload message carrying many transfers and return BOC"""
+    try:
+        if not 0 < len(transfers) <= HIGHLOAD_MAX_MESSAGES:
+            raise ValueError(f"A highload message carries 1-{HIGHLOAD_MAX_MESSAGES} transfers, got {len(transfers)}")
+
+        recipients = [
+            {
+                "address": to_address,
+                "amount": int(amount_ton * 1_000_000_000),  # Convert TON to nanoTON
+                "send_mode": 3  # Pay fees separately, ignore errors
+            }
+            for to_address, amount_ton in transfers
+        ]
+        # timeout=0 stops tonsdk from rewriting an id it considers stale (its rewrite overflows)
+        transfer = wallet.create_transfer_message(recipients, query_id, timeout=0)
+        return bytes_to_b64str(cell_to_boc(transfer["message"]))
+
+    except Exception as e:
+        raise Exception(f"Failed to create transaction: {str(e)}")
+
+
+async def is_query_processed(address: str, query_id: int) -> Dict:
+    """Ask the highload contract whether a query id has been processed: processed, not_processed or unknown"""
+    try:
+        status, data = await api_request("POST", "/runGetMethod", json={
+            "address": address,
+            "method": "processed?",
+            "stack": [{"type": "num", "value": hex(query_id)}]
+        })
+        if status == 200 and data.get("exit_code", 0) == 0 and data.get("stack"):
+            # processed? returns -1 for an executed query, 1 once the query id is older than the last
+            # cleanup (too old to tell) and 0 otherwise
+            value = int(data["stack"][0]["value"], 16)
+            return {"success": True, "state": {-1: "processed", 0: "not_processed"}.get(value, "unknown")}
+        return {"success": False, "error": f"API Error: {status}"}
+
+    except Exception as e:
+        return {"success": False, "error": f"Exception: {str(e)}"}
+
+
+def highload_batch_size() -> int:
+    """Transfers per highload message, capped at what the contract accepts"""
+    return min(HIGHLOAD_BATCH_SIZE, HIGHLOAD_MAX_MESSAGES)
+
+
+async def send_highload_transfers(wallet, address: str, transfers: List[Tuple[str, float]],
+                                  batch_offset: int = 0, total_batches: Optional[int] = None,
+                                  journal=None, op: str = "disperse") -> Dict[str, Any]:
+    """Send transfers from a highload wallet in HIGHLOAD_BATCH_SIZE chunks, confirming each by its message hash.
+
+    With a run journal, each batch is recorded under op as sent (with its query id) and confirmed.
+    """
+    batch_size = highload_batch_size()
+    batches = [transfers[i:i + batch_size] for i in range(0, len(transfers), batch_size)]
+    total_batches = total_batches or len(batches)
+    successful_transfers = 0
+    total_sent = 0
+    fees_paid = 0
+    confirmed_addresses = []
+
+    for batch_num, batch in enumerate(batches, 1):
+        batch_amount = sum(amount for _, amount in batch)
+        print(f"\nHighload batch #{batch_offset + batch_num}/{total_batches}: {len(batch)} transfer(s), {batch_amount:.4f} TON")
+
+        try:
+            # The query id makes the message replay-safe, so retries resend the same BOC
+            query_id = next_query_id()
+            boc = await create_highload_transaction(wallet, batch, query_id)
+        except Exception as e:
+            print(f"  ❌ Batch failed: {str(e)}")
+            continue
+
+        max_retries = 5
+        last_error = "Unknown error"
+        transaction = None
+        affected = [address] + [to_address for to_address, _ in batch]
+        if journal is not None:
+            journal.sent(op, [to_address for to_address, _ in batch], address,
+                         query_id=query_id, message_hash=message_hash(boc))
+
+        for attempt in range(max_retries):
+            send_result = await send_transaction_boc(boc, affected)
+            if send_result["success"]:
+                print(f"  ✅ Batch transaction sent! Waiting for confirmation...")
+                transaction = await await_message(message_hash(boc), affected=affected)
+                if transaction is None:
+                    last_error = "Confirmation timeout"
+                elif not transaction["success"]:
+                    last_error = describe_failure(transaction)
+                    if journal is not None:
+                        journal.failed(op, [to_address for to_address, _ in batch], last_error)
+                break
+
+            last_error = send_result.get('error', 'Unknown send error')
+            if attempt < max_retries - 1:
+                await asyncio.sleep(1)
+
+        if transaction is not None and transaction["success"]:
+            print("  🎉 Batch confirmed on the blockchain!")
+            print(f"  💳 Transaction: {transaction['explorer_link']} (fees {transaction['fees_ton']:.6f} TON)")
+            if journal is not None:
+                journal.confirmed(op, [to_address for to_address, _ in batch], tx_hash=transaction["hash"])
+            successful_transfers += len(batch)
+            total_sent += batch_amount
+            fees_paid += transaction["fees_ton"]
+            confirmed_addresses.extend(to_address for to_address, _ in batch)
+        else:
+            print(f"  ❌ Batch failed after {max_retries} attempts: {last_error}")
+
+    return {
+        "successful_transfers": successful_transfers,
+        "total_sent": total_sent,
+        "fees_paid": fees_paid,
+        "confirmed_addresses": confirmed_addresses
+    }
+
+
+async def deploy_highload_wallet(wallets_file: str = "wallets.txt", auto_confirm: bool = False) -> Dict[str, Any]:
+    """Fund the highload wallet from the first seed's v4r2 wallet and deploy it"""
+    seeds = await load_first_seeds(1, wallets_file)
+
+    if not seeds:
+        return command_error(f"No seeds found in {wallets_file}")
+
+    main_address, main_wallet = await create_wallet_from_seed(seeds[0])
+    highload_address, highload_wallet = await create_highload_wallet(seeds[0])
+
+    print(f"Main wallet (v4r2):     {main_address}")
+    print(f"Highload wallet (v2):   {highload_address}")
+
+    highload_info = await get_wallet_balance(highload_address)
+    if not highload_info["success"]:
+        return command_error(f"Error getting highload wallet balance: {highload_info['error']}")
+
+    if highload_info["status"] == "active":
+        print(f"✅ Highload wallet is already active (balance: {highload_info['balance_ton']:.4f} TON)")
+        return {"success": True, "address": highload_address, "deployed": False}
+
+    if highload_info["balance_ton"] < HIGHLOAD_FUND_AMOUNT:
+        main_info = await get_wallet_balance(main_address)
+        if not main_info["success"] or main_info["status"] != "active":
+            return command_error("Main wallet is not active! Cannot fund the highload wallet.")
+
+        if main_info["balance_ton"] < HIGHLOAD_FUND_AMOUNT + 0.001:
+            return command_error(f"❌ Main wallet needs at least {HIGHLOAD_FUND_AMOUNT + 0.001:.4f} TON, has {main_info['balance_ton']:.4f} TON")
+
+        if not confirm(f"Send {HIGHLOAD_FUND_AMOUNT:.4f} TON from the main wallet to the highload wallet? (y/n): ", auto_confirm):
+            return command_error("Deployment cancelled.")
+
+        seqno_result = await get_wallet_seqno(main_address)
+        if not seqno_result["success"]:
+            return command_error(f"❌ Failed to get seqno: {seqno_result.get('error', 'N/A')}")
+
+        seqno = seqno_result["seqno"]
+        boc = await create_transfer_transaction(main_wallet, highload_address, HIGHLOAD_FUND_AMOUNT, seqno)
+        send_result = await send_transaction_boc(boc, [main_address, highload_address])
+        if not send_result["success"]:
+            return command_error(f"❌ Funding transaction failed: {send_result.get('error', 'Unknown send error')}")
+
+        print(f"  ✅ Funding transaction sent! Waiting for confirmation...")
+        transaction = await await_message(send_result["message_hash"], affected=[main_address, highload_address])
+        if transaction is None:
+            return command_error("  ❌ Funding was sent but confirmation timed out.")
+        if not transaction["success"]:
+            return command_error(f"  ❌ Funding {describe_failure(transaction)}")
+        print(f"  💳 Transaction: {transaction['explorer_link']}")
+
+    print("  🔄 Deploying highload wallet...")
+    init_message = highload_wallet.create_init_external_message()
+    send_result = await send_transaction_boc(bytes_to_b64str(init_message["message"].to_boc(False)), [highload_address])
+    if not send_result["success"]:
+        return command_error(f"❌ Deployment failed: {send_result.get('error', 'Unknown send error')}")
+
+    start_time = asyncio.get_event_loop().time()
+    while asyncio.get_event_loop().time() - start_time < 60:
+        await asyncio.sleep(2)
+        info = await get_wallet_balance(highload_address, fresh=True)
+        if info["success"] and info["status"] == "active":
+            print(f"🎉 Highload wallet deployed! Balance: {info['balance_ton']:.4f} TON")
+            print("💡 Set USE_HIGHLOAD_WALLET = True in config.py to disperse and deploy through it.")
+            return {"success": True, "address": highload_address, "deployed": True}
+
+    return command_error("  ⏳ Timeout waiting for the highload wallet to become active.")
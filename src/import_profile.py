@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+# Module each entry point imports before it can do any work
+PROFILE_TARGETS = {
+    "menu": "main",
+    "generate": "src.utils",
+    "deploy": "src.deploy",
+    "disperse / collect": "src.transfer",
+    "balances": "src.balance_checker",
+    "deploy-highload": "src.highload",
+}
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_imports(module: str) -> List[Tuple[str, int, int]]:
+    """Import a module in a fresh interpreter with -X importtime; return (name, self us, cumulative us) rows"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=_ROOT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def package_costs(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Sum self import time per top-level package"""
+    costs: Dict[str, int] = defaultdict(int)
+    for name, self_us, _cumulative_us in rows:
+        costs[name.split(".")[0]] += self_us
+    return costs
+
+
+def print_import_profile(top: int = 8) -> None:
+    """Report the import cost of every entry point, heaviest packages first"""
+    print(f"Import cost per entry point (fresh interpreter, {sys.executable}):")
+    for target, module in PROFILE_TARGETS.items():
+        try:
+            rows = measure_imports(module)
+        except RuntimeError as e:
+            print(f"\n{target} ({module}): ❌ {e}")
+            continue
+
+        total_us = next(cumulative_us for name, _self_us, cumulative_us in reversed(rows) if name == module)
+        print(f"\n{target} ({module}): {total_us / 1000:.1f} ms")
+        costs = sorted(package_costs(rows).items(), key=lambda item: item[1], reverse=True)
+        for package, self_us in costs[:top]:
+            print(f"  {package:<24} {self_us / 1000:8.1f} ms")
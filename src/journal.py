@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config import JOURNAL_DIR, USE_HIGHLOAD_WALLET
+from .utils import get_wallet_states, get_transactions_by_message, MESSAGE_INDEX_GRACE, V4_MESSAGE_TTL
+from .confirmations import confirmation_watcher, describe_failure
+from .highload import is_query_processed
+
+
+class RunJournal:
+    """Append-only JSONL log of one command run: the plan, every signed message and its outcome.
+
+    Each operation is identified by (op, key), e.g. ("disperse", recipient address). Its state is the
+    last event recorded for it: planned, sent (in doubt until confirmed), confirmed or failed.
+    """
+
+    def __init__(self, path: str, header: Dict[str, Any]):
+        self.path = path
+        self.header = header
+        self._state: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._file = None
+
+    @property
+    def run_id(self) -> str:
+        return self.header["run_id"]
+
+    @property
+    def command(self) -> str:
+        return self.header["command"]
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.header["params"]
+
+    @classmethod
+    def create(cls, command: str, **params) -> "RunJournal":
+        """Start the journal of a new run"""
+        run_id = f"{command}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(2)}"
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        journal = cls(os.path.join(JOURNAL_DIR, f"{run_id}.jsonl"), {
+            "event": "run", "run_id": run_id, "command": command, "params": params, "t": time.time()
+        })
+        journal._write([journal.header])
+        print(f"📓 Journal: {journal.path} (resume with --resume {run_id})")
+        return journal
+
+    @classmethod
+    def load(cls, run_id: str) -> "RunJournal":
+        """Replay an existing journal; a torn last line from a crash is ignored"""
+        path = os.path.join(JOURNAL_DIR, f"{run_id}.jsonl")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No journal for run {run_id} in {JOURNAL_DIR}/")
+
+        journal = None
+        with open(path) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if journal is None:
+                    journal = cls(path, event)
+                else:
+                    journal._apply(event)
+        if journal is None or journal.header.get("event") != "run":
+            raise ValueError(f"{path} is not a run journal")
+        return journal
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        for key in event.get("keys", ()):
+            self._state[(event["op"], key)] = event
+
+    def _write(self, events: List[Dict[str, Any]]) -> None:
+        """Append events and fsync, so nothing acknowledged here is lost in a crash"""
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write("".join(json.dumps(event, separators=(",", ":")) + "\n" for event in events))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _record(self, event: str, op: str, keys: Iterable[str], **fields) -> None:
+        entry = {"event": event, "op": op, "keys": list(keys), "t": time.time(), **fields}
+        self._write([entry])
+        self._apply(entry)
+
+    def planned(self, op: str, items: Iterable[Tuple[str, Any]]) -> None:
+        """Record the planned (key, amount) operations of one chunk in a single write"""
+        now = time.time()
+        entries = [{"event": "planned", "op": op, "keys": [key], "amount": amount, "t": now} for key, amount in items]
+        if entries:
+            self._write(entries)
+            for entry in entries:
+                self._apply(entry)
+
+    def sent(self, op: str, keys: Iterable[str], wallet: str, **proof) -> None:
+        """Record a message about to be broadcast, with its message_hash and seqno (plus valid_until) or query_id"""
+        self._record("sent", op, keys, wallet=wallet, **proof)
+
+    def confirmed(self, op: str, keys: Iterable[str], **fields) -> None:
+        self._record("confirmed", op, keys, **fields)
+
+    def failed(self, op: str, keys: Iterable[str], error: str) -> None:
+        self._record("failed", op, keys, error=error)
+
+    def status(self, op: str, key: str) -> Optional[str]:
+        event = self._state.get((op, key))
+        return event["event"] if event else None
+
+    def is_settled(self, op: str, key: str) -> bool:
+        """True when the operation must not be sent again: confirmed, or sent and still unverified"""
+        return self.status(op, key) in ("confirmed", "sent")
+
+    def count(self, event: str) -> int:
+        return sum(1 for state in self._state.values() if state["event"] == event)
+
+    def in_doubt(self) -> List[Dict[str, Any]]:
+        """Distinct sent messages with no recorded outcome"""
+        pending = {}
+        for state in self._state.values():
+            if state["event"] == "sent":
+                pending[id(state)] = state
+        return list(pending.values())
+
+    def finish(self, result: Dict[str, Any]) -> None:
+        self._write([{"event": "finished", "result": result, "t": time.time()}])
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _record_transaction(journal: RunJournal, event: Dict[str, Any], transaction: Dict[str, Any]) -> None:
+    if transaction["success"]:
+        journal.confirmed(event["op"], event["keys"], verified=True, tx_hash=transaction["hash"])
+    else:
+        journal.failed(event["op"], event["keys"], describe_failure(transaction))
+
+
+async def _settle_seqno_zero(journal: RunJournal, event: Dict[str, Any]) -> None:
+    """An unindexed seqno 0 message may still land while the wallet is uninitialized; once the wallet has
+    moved past seqno 0 an activation has done its job, whichever message did it"""
+    wallet = event["wallet"]
+    state = (await get_wallet_states([wallet], fresh=True))[wallet]
+    if not state["success"]:
+        print(f"  ⚠️ Could not check the state of {wallet}: {state['error']}")
+    elif state["seqno"] > 0 and event["op"] == "activate":
+        journal.confirmed(event["op"], event["keys"], verified=True, already_active=True)
+    else:
+        print(f"  ⚠️ The seqno 0 message of {wallet} never expires and is not indexed, it stays in doubt")
+
+
+async def _settle_missing(journal: RunJournal, event: Dict[str, Any], found: Optional[Dict[str, Any]]) -> None:
+    """Wait for a message that is not indexed (yet) until it expired plus MESSAGE_INDEX_GRACE, then fail it.
+
+    A seqno 0 message never expires, so it is settled through the wallet state instead of failed.
+    """
+    wallet = event["wallet"]
+    never_expires = "query_id" not in event and event.get("seqno") == 0
+    if "query_id" in event:
+        # The upper 32 bits of a highload query id are the time after which it is rejected
+        expires_at = event["query_id"] >> 32
+    elif never_expires:
+        # Give it the usual time to show up in the index before looking at the wallet
+        expires_at = event["t"] + V4_MESSAGE_TTL
+    else:
+        # Journals written before valid_until was recorded: the message was signed just before t
+        expires_at = event.get("valid_until", event["t"] + V4_MESSAGE_TTL)
+    remaining = expires_at + MESSAGE_INDEX_GRACE - time.time()
+
+    message_hash = event.get("message_hash")
+    if message_hash is not None:
+        transaction = None
+        if remaining > 0:
+            transaction = await confirmation_watcher.wait_for_message(message_hash, remaining)
+        if transaction is None and (remaining > 0 or found is None or not found["success"]):
+            # Only a successful lookup after the deadline may mark the message failed
+            found = (await get_transactions_by_message([message_hash]))[message_hash]
+            if not found["success"]:
+                print(f"  ⚠️ Could not look up the message of {wallet}: {found['error']}")
+                return
+            transaction = found["transaction"]
+        if transaction is not None:
+            _record_transaction(journal, event, transaction)
+            return
+
+    if never_expires:
+        await _settle_seqno_zero(journal, event)
+        return
+
+    if "query_id" in event:
+        if message_hash is None and remaining > 0:
+            await asyncio.sleep(remaining)
+        result = await is_query_processed(wallet, event["query_id"])
+        if not result["success"]:
+            print(f"  ⚠️ Could not check query {event['query_id']} of {wallet}: {result['error']}")
+            return
+        if result["state"] == "processed":
+            journal.confirmed(event["op"], event["keys"], verified=True)
+            return
+        # "unknown" means cleaned up after expiry; with no transaction for the hash it did not land
+    elif message_hash is None:
+        print(f"  ⚠️ No message hash recorded for the message of {wallet}, it cannot be checked")
+        return
+
+    journal.failed(event["op"], event["keys"], "Not included before the message expired")
+
+
+async def resolve_in_doubt(journal: RunJournal) -> None:
+    """Settle messages sent before an interruption by their hash: confirmed or failed once their transaction
+    is found, failed once they are still missing MESSAGE_INDEX_GRACE seconds after they expired.
+
+    The wallet's seqno is no proof of inclusion, as another message may have used it.
+    """
+    pending = journal.in_doubt()
+    if not pending:
+        return
+
+    print(f"🔎 Re-checking {len(pending)} message(s) sent before the interruption...")
+    transactions = await get_transactions_by_message([event["message_hash"] for event in pending if "message_hash" in event])
+    missing = []
+    for event in pending:
+        found = transactions.get(event.get("message_hash"))
+        if found is not None and found["success"] and found["transaction"] is not None:
+            _record_transaction(journal, event, found["transaction"])
+        else:
+            missing.append(_settle_missing(journal, event, found))
+    # Messages that may still land are waited for together, on the shared confirmation poller
+    await asyncio.gather(*missing)
+
+    left = len(journal.in_doubt())
+    print(f"  ✅ {len(pending) - left} settled" + (f", ⚠️ {left} still in doubt and skipped this time" if left else ""))
+
+
+def resume_run(command: str, run_id: str) -> RunJournal:
+    """Load the journal of an interrupted run; the resumed run keeps the params it was started with"""
+    journal = RunJournal.load(run_id)
+    if journal.command != command:
+        raise ValueError(f"Run {run_id} is a {journal.command} run, not {command}")
+    if journal.params.get("highload", USE_HIGHLOAD_WALLET) != USE_HIGHLOAD_WALLET:
+        raise ValueError(f"Run {run_id} was made with USE_HIGHLOAD_WALLET = {journal.params['highload']}")
+    journal._write([{"event": "resumed", "t": time.time()}])
+    print(f"📓 Resuming run {run_id}: {journal.count('confirmed')} confirmed, "
+          f"{len(journal.in_doubt())} in doubt, {journal.count('failed')} failed")
+    return journal
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+from nacl.secret import SecretBox
+from config import KEY_CACHE_ENABLED
+
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def seed_fingerprint(seed: str) -> str:
+    """Stable lookup key for a seed; reveals nothing about the seed itself"""
+    return hashlib.blake2b(seed.encode("utf-8"), digest_size=32, person=b"twm-fingerprint").hexdigest()
+
+
+def _seed_box(seed: str) -> SecretBox:
+    """Encryption box for a cache entry, keyed by the seed it was derived from"""
+    key = hashlib.blake2b(seed.encode("utf-8"), digest_size=SecretBox.KEY_SIZE, person=b"twm-cache-key").digest()
+    return SecretBox(key)
+
+
+def _file_signature(path: str) -> str:
+    """Cheap change detector for the wallet file"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class KeyCache:
+    """SQLite cache of derived v4r2 addresses and keypairs for one wallet file.
+
+    Private keys are encrypted with a key derived from their own seed, so the
+    cache file alone is useless without wallets.txt.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Opened and synced in an executor thread, then read and written from the event loop
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS keys ("
+            "fingerprint TEXT PRIMARY KEY, address TEXT NOT NULL, "
+            "public_key BLOB NOT NULL, private_key BLOB NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.commit()
+
+    def sync_source(self, source_path: str, seeds: Iterable[str]) -> None:
+        """Drop entries for seeds that are no longer in the wallet file once it changes (seeds are only read then)"""
+        signature = _file_signature(source_path)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+        if row is not None and row[0] == signature:
+            return
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS current_seeds (fingerprint TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM current_seeds")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO current_seeds VALUES (?)",
+            ((seed_fingerprint(seed),) for seed in seeds)
+        )
+        self.conn.execute("DELETE FROM keys WHERE fingerprint NOT IN (SELECT fingerprint FROM current_seeds)")
+        self.conn.execute("DROP TABLE current_seeds")
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('source_signature', ?)", (signature,)
+        )
+        self.conn.commit()
+
+    def get_many(self, seeds: List[str]) -> Dict[str, Tuple[str, bytes, bytes]]:
+        """Return cached (address, public key, private key) for the seeds that are present"""
+        by_fingerprint = {seed_fingerprint(seed): seed for seed in seeds}
+        fingerprints = list(by_fingerprint)
+        found = {}
+        for start in range(0, len(fingerprints), _LOOKUP_CHUNK):
+            chunk = fingerprints[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT fingerprint, address, public_key, private_key FROM keys WHERE fingerprint IN ({placeholders})",
+                chunk
+            )
+            for fingerprint, address, public_key, encrypted_key in rows:
+                seed = by_fingerprint[fingerprint]
+                found[seed] = (address, bytes(public_key), _seed_box(seed).decrypt(encrypted_key))
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, Tuple[str, bytes, bytes]]]) -> None:
+        """Store derived (address, public key, private key) tuples keyed by seed"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO keys (fingerprint, address, public_key, private_key) VALUES (?, ?, ?, ?)",
+            (
+                (seed_fingerprint(seed), address, public_key, bytes(_seed_box(seed).encrypt(private_key)))
+                for seed, (address, public_key, private_key) in entries
+            )
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+_active_cache: Optional[KeyCache] = None
+
+
+def attach_key_cache(source_path: str, seeds: Iterable[str]) -> Optional[KeyCache]:
+    """Open the cache that belongs to a wallet file and make it the active one"""
+    global _active_cache
+    if not KEY_CACHE_ENABLED:
+        return None
+
+    cache_path = f"{source_path}.keys.db"
+    if _active_cache is None or _active_cache.path != cache_path:
+        close_key_cache()
+        _active_cache = KeyCache(cache_path)
+    _active_cache.sync_source(source_path, seeds)
+    return _active_cache
+
+
+def get_key_cache() -> Optional[KeyCache]:
+    """Return the cache attached by the last wallet file read, if any"""
+    return _active_cache
+
+
+def close_key_cache() -> None:
+    """Shutdown hook: close the active cache database"""
+    global _active_cache
+    if _active_cache is not None:
+        _active_cache.close()
+        _active_cache = None
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+Local in-memory toncenter v3 stand-in for benchmarks and regression runs.
+
+Implements the endpoints used by src/utils.py on top of an in-memory ledger.
+Submitted BOCs are parsed, queued and applied once per simulated block, so
+seqno, balances and wallet status evolve the way they do on chain.
+
+Usage:
+    python -m src.local_toncenter --port 8081 --fund <address>=1000
+    TONCENTER_API=http://127.0.0.1:8081/api/v3 python main.py
+
+--mirror PORT serves the same ledger on another port without the injected faults,
+like a second node in sync, for testing an endpoint pool:
+    python -m src.local_toncenter --port 8081 --slow-rate 0.2 --mirror 8082
+    TONCENTER_API=http://127.0.0.1:8081/api/v3,http://127.0.0.1:8082/api/v3 python main.py
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from aiohttp import web
+from tonsdk.contract.wallet import HighloadWalletV2Contract, WalletV4ContractR2
+from tonsdk.utils import Address
+
+
+NANO = 1_000_000_000
+
+
+class _Cell:
+    """Minimal ordinary cell: bit string plus references, with representation hash"""
+
+    __slots__ = ("bits", "refs", "_hash", "_depth")
+
+    def __init__(self, bits: str, refs: List["_Cell"]):
+        self.bits = bits
+        self.refs = refs
+        self._hash: Optional[bytes] = None
+        self._depth: Optional[int] = None
+
+    def depth(self) -> int:
+        if self._depth is None:
+            self._depth = 1 + max(ref.depth() for ref in self.refs) if self.refs else 0
+        return self._depth
+
+    def hash(self) -> bytes:
+        if self._hash is None:
+            bit_len = len(self.bits)
+            padded = self.bits
+            if bit_len % 8:
+                padded += "1" + "0" * (7 - bit_len % 8)
+            data = int(padded, 2).to_bytes(len(padded) // 8, "big") if padded else b""
+            descriptor = bytes([len(self.refs), bit_len // 8 + (bit_len + 7) // 8])
+            depths = b"".join(ref.depth().to_bytes(2, "big") for ref in self.refs)
+            hashes = b"".join(ref.hash() for ref in self.refs)
+            self._hash = hashlib.sha256(descriptor + data + depths + hashes).digest()
+        return self._hash
+
+
+def parse_boc(data: bytes) -> _Cell:
+    """Deserialize a single-root bag of cells (generic b5ee9c72 format)"""
+    if data[:4] != bytes.fromhex("b5ee9c72"):
+        raise ValueError("Unsupported BOC magic")
+
+    flags = data[4]
+    has_idx, size = flags & 0x80, flags & 0x07
+    off_bytes = data[5]
+    pos = 6
+
+    def read(n: int) -> int:
+        nonlocal pos
+        value = int.from_bytes(data[pos:pos + n], "big")
+        pos += n
+        return value
+
+    cells_num, roots_num = read(size), read(size)
+    read(size)  # absent cells
+    read(off_bytes)  # total cells size
+    roots = [read(size) for _ in range(roots_num)]
+    if has_idx:
+        pos += cells_num * off_bytes
+
+    raw = []
+    for _ in range(cells_num):
+        d1, d2 = data[pos], data[pos + 1]
+        pos += 2
+        payload = data[pos:pos + (d2 + 1) // 2]
+        pos += (d2 + 1) // 2
+        bits = "".join(f"{byte:08b}" for byte in payload)
+        if d2 % 2:
+            bits = bits.rstrip("0")[:-1]  # drop the completion tag
+        raw.append((bits, [read(size) for _ in range(d1 & 0x07)]))
+
+    # References always point to later cells, so build from the end
+    cells: List[Optional[_Cell]] = [None] * cells_num
+    for index in reversed(range(cells_num)):
+        bits, ref_ids = raw[index]
+        cells[index] = _Cell(bits, [cells[ref_id] for ref_id in ref_ids])
+    return cells[roots[0]]
+
+
+class _Reader:
+    """Sequential reader over a cell's bits and references"""
+
+    def __init__(self, cell: _Cell):
+        self.cell = cell
+        self.pos = 0
+        self.ref_pos = 0
+
+    def bits_left(self) -> int:
+        return len(self.cell.bits) - self.pos
+
+    def refs_left(self) -> int:
+        return len(self.cell.refs) - self.ref_pos
+
+    def bits(self, n: int) -> str:
+        if n > self.bits_left():
+            raise ValueError("Cell underflow")
+        value = self.cell.bits[self.pos:self.pos + n]
+        self.pos += n
+        return value
+
+    def uint(self, n: int) -> int:
+        return int(self.bits(n), 2) if n else 0
+
+    def int(self, n: int) -> int:
+        value = self.uint(n)
+        return value - (1 << n) if n and value >> (n - 1) else value
+
+    def ref(self) -> _Cell:
+        if not self.refs_left():
+            raise ValueError("Cell has no more references")
+        self.ref_pos += 1
+        return self.cell.refs[self.ref_pos - 1]
+
+    def coins(self) -> int:
+        return self.uint(self.uint(4) * 8)
+
+    def address(self) -> Optional[str]:
+        tag = self.uint(2)
+        if tag == 0:
+            return None
+        if tag != 2 or self.uint(1):
+            raise ValueError("Only addr_std without anycast is supported")
+        workchain = self.int(8)
+        return f"{workchain}:{self.uint(256):064x}"
+
+    def rest(self) -> _Cell:
+        """Remaining bits and references as a standalone cell"""
+        return _Cell(self.cell.bits[self.pos:], self.cell.refs[self.ref_pos:])
+
+
+def _parse_hashmap(cell: _Cell, key_len: int) -> Dict[int, _Reader]:
+    """Parse a Hashmap(key_len) into {key: reader positioned at the value}"""
+    result = {}
+
+    def walk(node: _Cell, prefix: str, remaining: int) -> None:
+        reader = _Reader(node)
+        if reader.uint(1) == 0:  # hml_short
+            length = 0
+            while reader.uint(1):
+                length += 1
+            label = reader.bits(length)
+        elif reader.uint(1) == 0:  # hml_long
+            length = reader.uint(remaining.bit_length())
+            label = reader.bits(length)
+        else:  # hml_same
+            bit = reader.bits(1)
+            length = reader.uint(remaining.bit_length())
+            label = bit * length
+        prefix += label
+        remaining -= length
+        if remaining == 0:
+            result[int(prefix, 2)] = reader
+        else:
+            walk(reader.ref(), prefix + "0", remaining - 1)
+            walk(reader.ref(), prefix + "1", remaining - 1)
+
+    walk(cell, "", key_len)
+    return result
+
+
+def _code_hash(contract_class) -> bytes:
+    """Hash of a wallet contract's code, used to recognise deployed wallet types"""
+    contract = contract_class(public_key=bytes(32), private_key=bytes(64), wc=0)
+    return parse_boc(bytes.fromhex(contract.code)).hash()
+
+
+def _raw(address: str) -> str:
+    return Address(address).to_string(False).lower()
+
+
+def _friendly(raw_address: str, bounceable: bool = False) -> str:
+    return Address(raw_address).to_string(True, True, bounceable)
+
+
+class Ledger:
+    """In-memory accounts, pending external messages and transactions"""
+
+    def __init__(self, fee: float = 0.0005, fee_per_message: float = 0.0005):
+        self.accounts: Dict[str, Dict] = {}
+        self.pending: List[Tuple[str, _Cell, str]] = []
+        self.transactions: Dict[str, Dict] = {}  # keyed by base64 in_msg hash
+        self.lt = 1_000_000
+        self.fee = int(fee * NANO)
+        self.fee_per_message = int(fee_per_message * NANO)
+        self.code_types = {
+            _code_hash(WalletV4ContractR2): "wallet v4 r2",
+            _code_hash(HighloadWalletV2Contract): "highload v2",
+        }
+
+    def account(self, raw_address: str) -> Dict:
+        return self.accounts.setdefault(raw_address, {
+            "balance": 0, "status": "uninit", "seqno": 0, "wallet_type": None,
+            "processed": set(), "last_transaction_lt": None, "last_transaction_hash": None,
+        })
+
+    def fund(self, address: str, amount_ton: float, active: bool = False) -> None:
+        """Credit an account; active=True makes it a deployed v4r2 wallet with seqno 1"""
+        account = self.account(_raw(address))
+        account["balance"] += int(amount_ton * NANO)
+        if active:
+            account.update(status="active", seqno=max(account["seqno"], 1), wallet_type="wallet v4 r2")
+
+    def exists(self, raw_address: str) -> bool:
+        account = self.accounts.get(raw_address)
+        return account is not None and (account["balance"] > 0 or account["status"] != "uninit")
+
+    def _parse_external(self, boc: bytes) -> Tuple[_Cell, Dict]:
+        """Parse an external-in message into its destination, state init and wallet order"""
+        message = parse_boc(boc)
+        reader = _Reader(message)
+        if reader.uint(2) != 2:
+            raise ValueError("Not an external inbound message")
+        reader.address()  # source, always addr_none
+        destination = reader.address()
+        reader.coins()  # import fee
+
+        code_type = None
+        if reader.uint(1):  # Maybe StateInit
+            state_init = _Reader(reader.ref()) if reader.uint(1) else reader
+            if state_init.uint(1):
+                state_init.uint(5)  # split_depth
+            if state_init.uint(1):
+                state_init.uint(2)  # special
+            code = state_init.ref() if state_init.uint(1) else None
+            if state_init.uint(1):
+                state_init.ref()  # data
+            if state_init.uint(1):
+                state_init.ref()  # library
+            code_type = self.code_types.get(code.hash()) if code is not None else None
+
+        body = _Reader(reader.ref()) if reader.uint(1) else _Reader(reader.rest())
+        body.bits(512)  # signature
+        return message, {"destination": destination, "code_type": code_type, "body": body}
+
+    def _parse_order(self, wallet_type: str, body: _Reader) -> Dict:
+        """Decode the signed part of a v4r2 or highload v2 external message"""
+        body.uint(32)  # wallet_id
+        if wallet_type == "highload v2":
+            query_id = body.uint(64)
+            messages = []
+            if body.uint(1):
+                for _key, value in sorted(_parse_hashmap(body.ref(), 16).items()):
+                    messages.append((value.uint(8), value.ref()))
+            return {"query_id": query_id, "valid_until": query_id >> 32, "messages": messages}
+
+        valid_until = body.uint(32)
+        seqno = body.uint(32)
+        if body.bits_left() >= 8:
+            body.uint(8)  # op: simple send
+        messages = []
+        while body.bits_left() >= 8 and body.refs_left():
+            messages.append((body.uint(8), body.ref()))
+        return {"seqno": seqno, "valid_until": valid_until, "messages": messages}
+
+    def validate(self, boc: bytes) -> Tuple[str, _Cell, Dict]:
+        """Check an external message against current state, as the node does before accepting it"""
+        message, parsed = self._parse_external(boc)
+        raw_address = parsed["destination"]
+        account = self.account(raw_address)
+        wallet_type = account["wallet_type"] if account["status"] == "active" else parsed["code_type"]
+        if wallet_type is None:
+            raise ValueError("Account is not initialized and the message carries no known wallet code")
+
+        order = self._parse_order(wallet_type, parsed["body"])
+        order["wallet_type"] = wallet_type
+        if order["valid_until"] < time.time():
+            raise ValueError("Message expired")
+        self.validate_order(account, order)
+        return raw_address, message, order
+
+    def submit(self, boc: bytes) -> str:
+        """Validate and queue an external message for the next block; return its base64 hash"""
+        raw_address, message, order = self.validate(boc)
+        self.pending.append((raw_address, message, order))
+        return base64.b64encode(message.hash()).decode()
+
+    def _record(self, raw_address: str, in_msg_hash: bytes, fees: int, success: bool,
+                skipped: int, bounced: bool, out_msgs: List[Dict]) -> Dict:
+        self.lt += 1
+        account = self.account(raw_address)
+        tx_hash = hashlib.sha256(f"{raw_address}:{self.lt}".encode()).digest()
+        account["last_transaction_lt"] = str(self.lt)
+        account["last_transaction_hash"] = base64.b64encode(tx_hash).decode()
+        tx = {
+            "account": raw_address.upper(),
+            "hash": base64.b64encode(tx_hash).decode(),
+            "lt": str(self.lt),
+            "now": int(time.time()),
+            "total_fees": str(fees),
+            "end_status": account["status"],
+            "in_msg": {"hash": base64.b64encode(in_msg_hash).decode()},
+            "out_msgs": out_msgs,
+            "description": {
+                "aborted": not success,
+                "compute_ph": {"success": True, "exit_code": 0},
+                "action": {"success": success, "skipped_actions": skipped},
+                "bounce": bounced,
+            },
+        }
+        self.transactions[tx["in_msg"]["hash"]] = tx
+        return tx
+
+    def _deliver(self, source: str, message: _Cell) -> None:
+        """Credit an internal message to its destination, bouncing it back from uninitialized accounts"""
+        reader = _Reader(message)
+        reader.uint(1)  # int_msg_info tag
+        reader.uint(1)  # ihr_disabled
+        bounce = reader.uint(1)
+        reader.uint(1)  # bounced
+        reader.address()  # source (filled in by the validator)
+        destination = reader.address()
+        value = reader.coins()
+
+        target = self.account(destination)
+        if bounce and target["status"] != "active":
+            refund = max(0, value - self.fee_per_message)
+            self.account(source)["balance"] += refund
+            self._record(destination, message.hash(), value - refund, False, 0, True, [])
+            return
+        target["balance"] += value
+        self._record(destination, message.hash(), 0, True, 0, False, [])
+
+    def apply_block(self) -> int:
+        """Apply every queued external message in arrival order; return how many were included"""
+        pending, self.pending = self.pending, []
+        included = 0
+        for raw_address, message, order in pending:
+            account = self.account(raw_address)
+            try:
+                self.validate_order(account, order)
+            except ValueError:
+                continue  # superseded by an earlier message in the same block
+
+            if account["status"] != "active":
+                account.update(status="active", wallet_type=order["wallet_type"])
+            if order["wallet_type"] == "highload v2":
+                account["processed"].add(order["query_id"])
+            else:
+                account["seqno"] += 1
+
+            fees = self.fee + self.fee_per_message * len(order["messages"])
+            account["balance"] = max(0, account["balance"] - fees)
+
+            deliveries, skipped, success = [], 0, True
+            balance = account["balance"]
+            for mode, out_message in order["messages"]:
+                reader = _Reader(out_message)
+                reader.bits(4)
+                reader.address()
+                reader.address()
+                value = balance if mode & 128 else reader.coins()
+                if value > balance:
+                    if mode & 2:
+                        skipped += 1
+                        continue
+                    success, deliveries = False, []
+                    break
+                balance -= value
+                deliveries.append(out_message)
+
+            if success:
+                account["balance"] = balance
+            out_msgs = [{"hash": base64.b64encode(out.hash()).decode()} for out in deliveries]
+            self._record(raw_address, message.hash(), fees, success, skipped, False, out_msgs)
+            for out_message in deliveries:
+                self._deliver(raw_address, out_message)
+            included += 1
+        return included
+
+    def validate_order(self, account: Dict, order: Dict) -> None:
+        """Replay protection and gas checks shared by submission and block inclusion"""
+        if order["wallet_type"] == "highload v2":
+            if order["query_id"] in account["processed"]:
+                raise ValueError("Query id already processed")
+        elif order["seqno"] != account["seqno"]:
+            raise ValueError(f"Seqno mismatch: expected {account['seqno']}, got {order['seqno']}")
+        if account["balance"] < self.fee:
+            raise ValueError("Not enough balance to pay for gas")
+
+    def wallet_json(self, raw_address: str) -> Dict:
+        account = self.account(raw_address)
+        return {
+            "address": raw_address.upper(),
+            "balance": str(account["balance"]),
+            "status": account["status"],
+            "is_wallet": account["wallet_type"] is not None,
+            "wallet_type": account["wallet_type"],
+            "seqno": account["seqno"],
+            "last_transaction_lt": account["last_transaction_lt"],
+            "last_transaction_hash": account["last_transaction_hash"],
+        }
+
+
+def create_app(ledger: Ledger, latency: float = 0.0, block_interval: float = 2.0,
+               rate_429: float = 0.0, error_rate: float = 0.0, lost_ack_rate: float = 0.0,
+               slow_rate: float = 0.0, slow_latency: float = 2.0, produce: bool = True) -> web.Application:
+    """Build the aiohttp application serving the toncenter v3 subset; produce=False leaves blocks to another app"""
+    stats: Counter = Counter()
+
+    @web.middleware
+    async def faults(request: web.Request, handler):
+        stats[request.path] += 1
+        if latency:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * latency)
+        if request.path.startswith("/api/"):
+            if random.random() < slow_rate:
+                stats["slow"] += 1
+                await asyncio.sleep(slow_latency)
+            if random.random() < rate_429:
+                stats["429"] += 1
+                return web.json_response({"error": "Ratelimit exceed"}, status=429, headers={"Retry-After": "1"})
+            if random.random() < error_rate:
+                stats["5xx"] += 1
+                return web.json_response({"error": "Injected failure"}, status=500)
+        return await handler(request)
+
+    def address_param(request: web.Request) -> str:
+        try:
+            return _raw(request.query["address"])
+        except Exception:
+            raise web.HTTPUnprocessableEntity(text='{"error": "Invalid address"}', content_type="application/json")
+
+    async def wallet(request: web.Request) -> web.Response:
+        return web.json_response(ledger.wallet_json(address_param(request)))
+
+    async def address_information(request: web.Request) -> web.Response:
+        account = ledger.wallet_json(address_param(request))
+        status = "uninitialized" if account["status"] == "uninit" else account["status"]
+        return web.json_response({
+            "balance": account["balance"],
+            "status": status,
+            "last_transaction_lt": account["last_transaction_lt"],
+            "last_transaction_hash": account["last_transaction_hash"],
+        })
+
+    async def wallet_states(request: web.Request) -> web.Response:
+        try:
+            addresses = [_raw(address) for address in request.query.getall("address", [])]
+        except Exception:
+            return web.json_response({"error": "Invalid address"}, status=422)
+        wallets = [ledger.wallet_json(address) for address in addresses if ledger.exists(address)]
+        address_book = {address.upper(): {"user_friendly": _friendly(address)} for address in addresses}
+        return web.json_response({"wallets": wallets, "address_book": address_book})
+
+    async def account_states(request: web.Request) -> web.Response:
+        try:
+            addresses = [_raw(address) for address in request.query.getall("address", [])]
+        except Exception:
+            return web.json_response({"error": "Invalid address"}, status=422)
+        accounts = []
+        for address in addresses:
+            if ledger.exists(address):
+                account = ledger.wallet_json(address)
+                accounts.append({key: account[key] for key in (
+                    "address", "balance", "status", "last_transaction_lt", "last_transaction_hash"
+                )})
+        address_book = {address.upper(): {"user_friendly": _friendly(address)} for address in addresses}
+        return web.json_response({"accounts": accounts, "address_book": address_book})
+
+    async def transactions_by_message(request: web.Request) -> web.Response:
+        hashes = request.query.getall("msg_hash", [])
+        if len(hashes) > 1:
+            # Like toncenter v3, which reads a single msg_hash per call
+            return web.json_response({"error": "msg_hash: expected a single value"}, status=422)
+        transactions = [ledger.transactions[message] for message in hashes if message in ledger.transactions]
+        return web.json_response({"transactions": transactions, "address_book": {}})
+
+    async def message(request: web.Request) -> web.Response:
+        try:
+            payload = await request.json()
+            message_hash = ledger.submit(base64.b64decode(payload["boc"]))
+        except Exception as e:
+            return web.json_response({"error": f"Cannot apply external message: {e}"}, status=500)
+        if random.random() < lost_ack_rate:
+            # Accepted, but the client never learns it: the case retries must not double-submit
+            stats["lost_ack"] += 1
+            return web.json_response({"error": "Gateway timeout"}, status=504)
+        return web.json_response({"message_hash": message_hash, "message_hash_norm": message_hash})
+
+    async def run_get_method(request: web.Request) -> web.Response:
+        payload = await request.json()
+        account = ledger.account(_raw(payload["address"]))
+        if payload.get("method") == "seqno":
+            value = account["seqno"]
+        elif payload.get("method") == "processed?":
+            query_id = int(payload["stack"][0]["value"], 16)
+            if query_id in account["processed"]:
+                value = -1
+            else:
+                # Past its expiry the contract may have cleaned the query id up: too old to tell
+                value = 1 if (query_id >> 32) < time.time() else 0
+        else:
+            return web.json_response({"exit_code": 11, "stack": []})
+        return web.json_response({"gas_used": 0, "exit_code": 0, "stack": [{"type": "num", "value": hex(value)}]})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(dict(stats))
+
+    async def produce_blocks(app: web.Application):
+        async def loop():
+            while True:
+                await asyncio.sleep(block_interval)
+                ledger.apply_block()
+
+        task = asyncio.create_task(loop())
+        yield
+        task.cancel()
+
+    app = web.Application(middlewares=[faults])
+    app["ledger"] = ledger
+    app["stats"] = stats
+    app.router.add_get("/api/v3/wallet", wallet)
+    app.router.add_get("/api/v3/addressInformation", address_information)
+    app.router.add_get("/api/v3/walletStates", wallet_states)
+    app.router.add_get("/api/v3/accountStates", account_states)
+    app.router.add_get("/api/v3/transactionsByMessage", transactions_by_message)
+    app.router.add_post("/api/v3/message", message)
+    app.router.add_post("/api/v3/runGetMethod", run_get_method)
+    app.router.add_get("/_stats", get_stats)
+    if produce:
+        app.cleanup_ctx.append(produce_blocks)
+    return app
+
+
+async def _serve(apps: List[Tuple[web.Application, int]], host: str) -> None:
+    """Run several applications on their own ports until interrupted"""
+    runners = []
+    try:
+        for app, port in apps:
+            runner = web.AppRunner(app)
+            await runner.setup()
+            await web.TCPSite(runner, host, port).start()
+            runners.append(runner)
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def _parse_funding(value: str) -> Tuple[str, float]:
+    address, _, amount = value.partition("=")
+    return address, float(amount or 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local in-memory toncenter v3 stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean response latency in seconds")
+    parser.add_argument("--block-interval", type=float, default=2.0, help="seconds between simulated blocks")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of API requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API requests answered with 500")
+    parser.add_argument("--lost-ack-rate", type=float, default=0.0,
+                        help="fraction of accepted messages answered with 504 anyway")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of API requests delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=2.0, help="seconds a slow request is delayed")
+    parser.add_argument("--mirror", type=int, action="append", default=[], metavar="PORT",
+                        help="also serve the same ledger on PORT without injected faults (repeatable)")
+    parser.add_argument("--fee", type=float, default=0.0005, help="TON charged per external message")
+    parser.add_argument("--fee-per-message", type=float, default=0.0005, help="TON charged per outgoing message")
+    parser.add_argument("--fund", action="append", default=[], metavar="ADDRESS=TON",
+                        help="create an active v4r2 wallet with this balance (repeatable)")
+    parser.add_argument("--fund-uninit", action="append", default=[], metavar="ADDRESS=TON",
+                        help="credit an uninitialized account (repeatable)")
+    args = parser.parse_args()
+
+    ledger = Ledger(args.fee, args.fee_per_message)
+    for value in args.fund:
+        ledger.fund(*_parse_funding(value), active=True)
+    for value in args.fund_uninit:
+        ledger.fund(*_parse_funding(value))
+
+    app = create_app(ledger, args.latency, args.block_interval, args.rate_429, args.error_rate, args.lost_ack_rate,
+                     args.slow_rate, args.slow_latency)
+    print(f"🧪 Local toncenter listening on http://{args.host}:{args.port}/api/v3")
+    if not args.mirror:
+        web.run_app(app, host=args.host, port=args.port, print=None)
+        return
+
+    apps = [(app, args.port)]
+    for port in args.mirror:
+        apps.append((create_app(ledger, args.latency, args.block_interval, produce=False), port))
+        print(f"🧪 Mirror listening on http://{args.host}:{port}/api/v3")
+    try:
+        asyncio.run(_serve(apps, args.host))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
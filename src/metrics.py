@@ -0,0 +1,294 @@
+import abc
+import functools
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from config import METRICS_PORT, METRICS_TEXTFILE, METRICS_SUMMARY
+
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONFIRMATION_BUCKETS = (1.0, 2.0, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0)
+
+# Samples are written from the event loop and read by the exporter thread
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    """Base for a labelled metric family registered for export"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        ...
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Gauge(_Metric):
+    """Point-in-time value per label set"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution per label set; quantiles are estimated from the buckets"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket (like PromQL histogram_quantile)"""
+        state = self._values.get(self._key(labels))
+        if not state or not state["count"]:
+            return None
+        rank = q * state["count"]
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, state["counts"]):
+            if count and seen + count >= rank:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound if bound != math.inf else lower
+        return lower
+
+    def label_sets(self) -> List[Dict[str, str]]:
+        return [dict(zip(self.label_names, key)) for key in list(self._values)]
+
+    def samples(self):
+        for key, state in self._values.items():
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, state["sum"]
+            yield f"{self.name}_count", labels, state["count"]
+
+
+http_requests = Counter(
+    "twm_http_requests_total", "toncenter HTTP requests by endpoint and status code (error = no response)",
+    ("endpoint", "status")
+)
+http_latency = Histogram(
+    "twm_http_request_duration_seconds", "toncenter HTTP round trip time, excluding client-side queueing",
+    ("endpoint",)
+)
+http_queue = Histogram(
+    "twm_http_queue_seconds", "Time a request waited for a concurrency slot and a rate-limit token",
+    ("endpoint",)
+)
+http_retries = Counter("twm_http_retries_total", "toncenter requests retried by api_request", ("endpoint", "reason"))
+rpc_requests = Counter(
+    "twm_rpc_requests_total", "Requests per RPC endpoint by outcome: ok, throttled, server_error, error or cancelled",
+    ("url", "result")
+)
+rpc_latency = Gauge("twm_rpc_latency_seconds", "Smoothed round trip time per RPC endpoint, used for routing", ("url",))
+rpc_rate_limit = Gauge("twm_rate_limit_rps", "Current client-side request rate per RPC endpoint after 429 backoff", ("url",))
+hedged_requests = Counter(
+    "twm_hedged_requests_total", "Reads sent to a second endpoint after RPC_HEDGE_DELAY, by whose answer was used",
+    ("winner",)
+)
+message_retries = Counter(
+    "twm_message_retries_total", "Send retries of a signed message: already_included, rebroadcast or resigned", ("outcome",)
+)
+state_reads = Counter(
+    "twm_state_reads_total", "Wallet state and balance reads by source: cache, shared (joined an identical read) or network",
+    ("source",)
+)
+seqno_lookups = Counter(
+    "twm_seqno_lookups_total", "Seqnos taken for a new message, from the local tracker or the network", ("source",)
+)
+operations = Counter("twm_operations_total", "Calls of instrumented utils functions by outcome", ("operation", "result"))
+operation_latency = Histogram(
+    "twm_operation_duration_seconds", "Duration of instrumented utils functions, including retries", ("operation",)
+)
+confirmations = Counter(
+    "twm_confirmations_total", "Waits for a sent message's transaction to appear, by outcome", ("kind", "result")
+)
+confirmation_latency = Histogram(
+    "twm_confirmation_seconds", "Time from starting to wait until a transaction was confirmed", ("kind",),
+    buckets=CONFIRMATION_BUCKETS
+)
+
+
+def instrumented(operation: str):
+    """Count and time an async function; a result dict with success=False or an exception counts as a failure"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            succeeded = False
+            try:
+                result = await func(*args, **kwargs)
+                succeeded = not isinstance(result, dict) or result.get("success", True)
+                return result
+            finally:
+                operation_latency.observe(time.perf_counter() - start, operation=operation)
+                operations.inc(operation=operation, result="success" if succeeded else "failure")
+        return wrapper
+    return decorator
+
+
+def record_confirmation(kind: str, confirmed: bool, elapsed: float) -> None:
+    """Record the outcome of waiting for a sent message to be found by its hash (kind "message")"""
+    confirmations.inc(kind=kind, result="confirmed" if confirmed else "timeout")
+    if confirmed:
+        confirmation_latency.observe(elapsed, kind=kind)
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str) -> None:
+    """Write the metrics atomically, as the node_exporter textfile collector expects"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(render())
+    os.replace(temp_path, path)
+
+
+def format_summary() -> str:
+    """Per-endpoint request counts, error counts and latency percentiles for the console"""
+    lines = [f"{'Endpoint':<22} {'Requests':>8} {'429':>5} {'5xx':>5} {'Errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+    endpoints = sorted({labels["endpoint"] for labels in http_latency.label_sets()})
+    for endpoint in endpoints:
+        by_status: Dict[str, float] = {}
+        for key, value in list(http_requests._values.items()):
+            if key[0] == endpoint:
+                by_status[key[1]] = value
+        server_errors = sum(value for status, value in by_status.items() if status.startswith("5"))
+        percentiles = [http_latency.quantile(q, endpoint=endpoint) for q in (0.5, 0.95, 0.99)]
+        lines.append(
+            f"{endpoint:<22} {int(sum(by_status.values())):>8} {int(by_status.get('429', 0)):>5} "
+            f"{int(server_errors):>5} {int(by_status.get('error', 0)):>6} "
+            + " ".join(f"{(p or 0) * 1000:>8.0f}" for p in percentiles)
+        )
+    return "\n".join(lines)
+
+
+_server = None
+
+
+def start_http_server(port: int, host: str = "127.0.0.1"):
+    """Serve GET /metrics from a daemon thread; keeps working across event loops"""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
+
+
+def start_exporters() -> None:
+    """Start the /metrics endpoint when METRICS_PORT is set"""
+    if METRICS_PORT and _server is None:
+        start_http_server(METRICS_PORT)
+        print(f"📈 Metrics at http://127.0.0.1:{METRICS_PORT}/metrics")
+
+
+def finish_exporters() -> None:
+    """Shutdown hook: write the textfile and summary if configured, stop the endpoint"""
+    global _server
+    if METRICS_TEXTFILE:
+        write_textfile(METRICS_TEXTFILE)
+    if METRICS_SUMMARY and http_latency.label_sets():
+        print("\n📈 toncenter requests:")
+        print(format_summary())
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,138 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+from config import PROFILE_DIR, PROFILE_SAMPLE_INTERVAL
+
+
+def _frame_stack(frame) -> List[str]:
+    """Function names from the outermost to the innermost frame"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_chain(task: asyncio.Task) -> List[str]:
+    """The coroutines a task is suspended in, from the task's entry point to the innermost await"""
+    chain = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            chain.append(type(awaitable).__name__)
+            break
+        chain.append(getattr(frame.f_code, "co_qualname", frame.f_code.co_name))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "ag_await", None)
+    return chain
+
+
+class StackSampler:
+    """Wall-clock sampler of every thread's stack plus every asyncio task's await chain.
+
+    Thread samples show where CPU goes (an idle event loop shows up as select);
+    task samples show what the suspended coroutines are waiting on.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float):
+        self.loop = loop
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.tasks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    stack = [names.get(thread_id, str(thread_id))] + _frame_stack(frame)
+                    self.stacks[";".join(stack)] += 1
+            try:
+                tasks = list(asyncio.all_tasks(self.loop))
+            except RuntimeError:  # the task set changed while being copied; skip this sample
+                continue
+            for task in tasks:
+                if not task.done():
+                    self.tasks[";".join(_await_chain(task))] += 1
+
+
+def _write_collapsed(path: str, samples: Counter) -> None:
+    """Write samples in the collapsed-stack format read by flamegraph.pl and speedscope"""
+    with open(path, "w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack.replace(' ', '_')} {count}\n")
+
+
+class CommandProfiler:
+    """Profile one command: cProfile, a stack sampler and tracemalloc, written to PROFILE_DIR/<time>_<name>/"""
+
+    def __init__(self, name: str, out_dir: str = PROFILE_DIR, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.name = name
+        self.out_dir = os.path.join(out_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name}")
+        self.interval = interval
+        self._profile = cProfile.Profile()
+        self._sampler: Optional[StackSampler] = None
+        self._started = 0.0
+
+    async def __aenter__(self):
+        tracemalloc.start(10)
+        self._sampler = StackSampler(asyncio.get_running_loop(), self.interval)
+        self._sampler.start()
+        self._started = time.perf_counter()
+        self._profile.enable()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        elapsed = time.perf_counter() - self._started
+        self._sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._profile.dump_stats(os.path.join(self.out_dir, "cpu.pstats"))
+        report = io.StringIO()
+        pstats.Stats(self._profile, stream=report).sort_stats("cumulative").print_stats(40)
+        with open(os.path.join(self.out_dir, "cpu.txt"), "w") as f:
+            f.write(report.getvalue())
+        _write_collapsed(os.path.join(self.out_dir, "stacks.collapsed"), self._sampler.stacks)
+        _write_collapsed(os.path.join(self.out_dir, "tasks.collapsed"), self._sampler.tasks)
+
+        with open(os.path.join(self.out_dir, "memory.txt"), "w") as f:
+            f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB, at exit: {current / 1024 / 1024:.1f} MiB\n\n")
+            snapshot = snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ))
+            for stat in snapshot.statistics("lineno")[:25]:
+                f.write(f"{stat}\n")
+
+        print(f"\n🔬 Profile of '{self.name}' ({elapsed:.1f}s wall, peak {peak / 1024 / 1024:.1f} MiB) saved to {self.out_dir}/")
+        print("   cpu.pstats / cpu.txt, stacks.collapsed and tasks.collapsed (flamegraph.pl, speedscope), memory.txt")
+        if sys.modules.get("config") and getattr(sys.modules["config"], "DERIVE_POOL", "") == "process":
+            print("   💡 Key derivation runs in worker processes; set DERIVE_POOL = \"thread\" to see PBKDF2 in the stacks")
+        return False
@@ -0,0 +1,145 @@
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+class SnapshotStore:
+    """SQLite store of the last known state of every wallet of one wallet file (<file>.snapshots.db).
+
+    Each balance check with --snapshot or --refresh is a snapshot; accounts holds the latest state
+    per address and changes the balance and status differences each snapshot found.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, taken_at REAL NOT NULL, refreshed INTEGER NOT NULL, "
+            "checked INTEGER, changed INTEGER)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            "address TEXT PRIMARY KEY, idx INTEGER NOT NULL, balance_nano INTEGER NOT NULL, status TEXT NOT NULL, "
+            "seqno INTEGER NOT NULL, last_transaction_lt INTEGER, snapshot_id INTEGER NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "snapshot_id INTEGER NOT NULL, address TEXT NOT NULL, idx INTEGER NOT NULL, "
+            "old_balance_nano INTEGER, new_balance_nano INTEGER NOT NULL, old_status TEXT, new_status TEXT NOT NULL, "
+            "PRIMARY KEY (snapshot_id, address))"
+        )
+        self.conn.commit()
+
+    def latest(self) -> Optional[Tuple[int, float]]:
+        """(id, taken_at) of the last completed snapshot"""
+        return self.conn.execute(
+            "SELECT id, taken_at FROM snapshots WHERE checked IS NOT NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+
+    def begin(self, refreshed: bool) -> int:
+        cursor = self.conn.execute(
+            "INSERT INTO snapshots (taken_at, refreshed) VALUES (?, ?)", (time.time(), int(refreshed))
+        )
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def get_many(self, addresses: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Last known balance_nano, status, seqno and last_transaction_lt of the addresses that are stored"""
+        found = {}
+        for start in range(0, len(addresses), _LOOKUP_CHUNK):
+            chunk = addresses[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                "SELECT address, balance_nano, status, seqno, last_transaction_lt "
+                f"FROM accounts WHERE address IN ({placeholders})",
+                chunk
+            )
+            for address, balance_nano, status, seqno, lt in rows:
+                found[address] = {"balance_nano": balance_nano, "status": status, "seqno": seqno,
+                                  "last_transaction_lt": lt}
+        return found
+
+    def record(self, snapshot_id: int, rows: Iterable[Tuple[int, str, Dict[str, Any]]],
+               previous: Dict[str, Dict[str, Any]], track_changes: bool) -> int:
+        """Store successful (index, address, state) rows; returns how many differ from the previous state"""
+        accounts = []
+        changes = []
+        for index, address, state in rows:
+            balance_nano = int(state["balance_nano"])
+            lt = state["last_transaction_lt"]
+            accounts.append((address, index, balance_nano, state["status"], state["seqno"],
+                             int(lt) if lt is not None else None, snapshot_id))
+            old = previous.get(address)
+            if not track_changes:
+                continue
+            if old is None or old["balance_nano"] != balance_nano or old["status"] != state["status"]:
+                changes.append((snapshot_id, address, index, old and old["balance_nano"], balance_nano,
+                                old and old["status"], state["status"]))
+
+        self.conn.executemany("INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?)", accounts)
+        self.conn.executemany("INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?, ?, ?, ?)", changes)
+        self.conn.commit()
+        return len(changes)
+
+    def finish(self, snapshot_id: int, checked: int, changed: int) -> None:
+        self.conn.execute("UPDATE snapshots SET checked = ?, changed = ? WHERE id = ?", (checked, changed, snapshot_id))
+        self.conn.commit()
+
+    def abort(self, snapshot_id: int) -> None:
+        """Drop a snapshot whose scan did not complete; the account states it already stored are kept"""
+        self.conn.execute("DELETE FROM changes WHERE snapshot_id = ?", (snapshot_id,))
+        self.conn.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+        self.conn.commit()
+
+    def net_change(self, snapshot_id: int) -> int:
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(new_balance_nano - COALESCE(old_balance_nano, 0)), 0) FROM changes WHERE snapshot_id = ?",
+            (snapshot_id,)
+        ).fetchone()
+        return row[0]
+
+    def top_changes(self, snapshot_id: int, limit: int) -> List[Tuple]:
+        """(index, address, old balance, new balance, old status, new status), largest absolute change first"""
+        return self.conn.execute(
+            "SELECT idx, address, old_balance_nano, new_balance_nano, old_status, new_status FROM changes "
+            "WHERE snapshot_id = ? ORDER BY ABS(new_balance_nano - COALESCE(old_balance_nano, 0)) DESC, idx "
+            "LIMIT ?",
+            (snapshot_id, limit)
+        ).fetchall()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_snapshot_store(wallets_file: str) -> SnapshotStore:
+    """Open the snapshot database that belongs to a wallet file"""
+    return SnapshotStore(f"{wallets_file}.snapshots.db")
+
+
+def print_snapshot_diff(store: SnapshotStore, snapshot_id: int, since: Optional[float], changed: int,
+                        limit: int) -> None:
+    """Print what changed since the previous snapshot: net balance change and the largest changes"""
+    if since is None:
+        print("📸 First snapshot of this wallet file saved; the next --snapshot or --refresh will show a diff")
+        return
+
+    age = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(since))
+    if not changed:
+        print(f"📸 No balance changes since the snapshot of {age}")
+        return
+
+    print(f"📸 {changed} wallet(s) changed since the snapshot of {age}, "
+          f"net {store.net_change(snapshot_id) / 1_000_000_000:+.4f} TON:")
+    for index, address, old_balance, new_balance, old_status, new_status in store.top_changes(snapshot_id, limit):
+        old_ton = (old_balance or 0) / 1_000_000_000
+        line = f"  #{index:<6} {address}  {old_ton:.4f} -> {new_balance / 1_000_000_000:.4f} ({new_balance / 1_000_000_000 - old_ton:+.4f})"
+        if old_status != new_status:
+            line += f"  {old_status or 'new'} -> {new_status}"
+        print(line)
+    if changed > limit:
+        print(f"  ... and {changed - limit} more")
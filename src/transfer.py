@@ -1,182 +1,305 @@
 import asyncio
+import math
 import random
-from typing import List, Dict, Any
-from config import DISPERSE_TON_AMOUNT
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from config import DISPERSE_TON_AMOUNT, USE_HIGHLOAD_WALLET
 from .utils import (
-    load_seeds, create_wallet_from_seed, get_wallet_balance,
-    get_wallet_seqno, send_transaction_boc, create_transfer_transaction,
-    await_seqno_increment
+    load_first_seeds, iter_wallet_chunks, create_wallet_from_seed, get_wallet_balance, get_wallet_states,
+    get_wallet_seqno, seqno_tracker, send_transaction_boc, invalidate_states, create_transfer_transaction,
+    create_multi_transfer_transaction, V4_MAX_MESSAGES, SignedMessage, run_bounded, send_limit, confirm, command_error
 )
+from .confirmations import await_message, describe_failure
+from .highload import create_highload_wallet, send_highload_transfers, highload_batch_size
+from .journal import RunJournal, resume_run, resolve_in_doubt
 
 
-async def transfer_from_one_to_another() -> None:
-    """Transfer TON from first wallet to all other wallets"""
-    seeds = await load_seeds()
+async def _send_v4_batches(main_wallet, main_address: str, transfers: List[Tuple[str, float]], fee_per_transfer: float,
+                           journal: RunJournal, batch_offset: int = 0, total_batches: Optional[int] = None) -> Dict[str, Any]:
+    """Send transfers from the v4r2 main wallet, packing up to V4_MAX_MESSAGES recipients into each signed message"""
+    successful_transfers = 0
+    total_sent = 0
+    fees_paid = 0
+    batches = [transfers[i:i + V4_MAX_MESSAGES] for i in range(0, len(transfers), V4_MAX_MESSAGES)]
+    total_batches = total_batches or len(batches)
     
-    if len(seeds) < 2:
-        print("Need at least 2 wallets for transfers")
-        return
+    for batch_num, batch in enumerate(batches, batch_offset + 1):
+        try:
+            print(f"\nBatch #{batch_num}/{total_batches}:")
+            for recipient, amount in batch:
+                print(f"  To: {recipient} ({amount:.4f} TON)")
+            
+            # Keep only the transfers we still have enough balance for
+            current_balance_info = await get_wallet_balance(main_address)
+            if current_balance_info["success"]:
+                current_balance = current_balance_info["balance_ton"]
+                affordable = []
+                for recipient, amount in batch:
+                    if current_balance >= amount + fee_per_transfer:
+                        affordable.append((recipient, amount))
+                        current_balance -= amount + fee_per_transfer
+                    else:
+                        print(f"  ❌ Insufficient balance for transfer to {recipient} (need {amount + fee_per_transfer:.6f} TON, have {current_balance:.4f} TON)")
+                batch = affordable
+                if not batch:
+                    continue
+            
+            batch_amount = sum(amount for _, amount in batch)
+            affected = [main_address] + [recipient for recipient, _ in batch]
+            print(f"  🔄 Sending {batch_amount:.4f} TON in {len(batch)} transfer(s)...")
+
+            max_retries = 5
+            transfer_successful = False
+            last_error = "Unknown error"
+            signed = None
+            fresh_seqno = False
+
+            for attempt in range(max_retries):
+                try:
+                    transaction = None
+                    if signed is not None:
+                        # A retry looks the signed message up by hash; only a message that can no longer land is re-signed.
+                        # A rejected rebroadcast may mean an earlier copy landed, so that waits for the hash or expiry
+                        check = await signed.recheck(wait=signed.refused)
+                        if not check["success"]:
+                            last_error = f"Failed to look up the previous attempt: {check.get('error', 'N/A')}"
+                            await asyncio.sleep(1)
+                            continue
+                        if check["state"] == "included":
+                            print("  🎉 Batch from the previous attempt is already on the blockchain!")
+                            transaction = check["transaction"]
+                            invalidate_states(affected)
+                        elif check["state"] == "expired":
+                            signed = None
+
+                    if transaction is None:
+                        if signed is None:
+                            seqno_result = await (get_wallet_seqno(main_address) if fresh_seqno
+                                                  else seqno_tracker.next_seqno(main_address))
+                            if not seqno_result["success"]:
+                                last_error = f"Failed to get seqno: {seqno_result.get('error', 'N/A')}"
+                                await asyncio.sleep(1)
+                                continue
+                            boc = await create_multi_transfer_transaction(
+                                main_wallet, batch, seqno_result["seqno"]
+                            )
+                            signed = SignedMessage(main_address, seqno_result["seqno"], boc)
+                            journal.sent("disperse", [recipient for recipient, _ in batch], main_address,
+                                         seqno=signed.seqno, valid_until=signed.expires_at, message_hash=signed.hash)
+
+                        # While the message can still land, a retry rebroadcasts the same BOC
+                        send_result = await send_transaction_boc(signed.boc, affected)
+                        signed.record_send(send_result)
+                        if send_result["success"]:
+                            print(f"  ✅ Batch transaction sent! Waiting for confirmation...")
+                            transaction = await await_message(signed.hash, affected=affected)
+                            if transaction is None:
+                                print("  ❌ Batch was sent but confirmation timed out.")
+                                last_error = "Confirmation timeout"
+                                seqno_tracker.forget(main_address)
+                                break
+                        else:
+                            last_error = send_result.get('error', 'Unknown send error')
+                            seqno_tracker.forget(main_address)
+                            if signed.refused and not signed.broadcast:
+                                # Rejected without ever being broadcast (e.g. a stale seqno): sign again with the network's seqno
+                                signed = None
+                                fresh_seqno = True
+
+                    if transaction is not None:
+                        # The message landed and used its seqno, so it must not be sent again
+                        signed.landed()
+                        if transaction["success"]:
+                            print("  🎉 Batch confirmed on the blockchain!")
+                            print(f"  💳 Transaction: {transaction['explorer_link']} (fees {transaction['fees_ton']:.6f} TON)")
+                            journal.confirmed("disperse", [recipient for recipient, _ in batch], tx_hash=transaction["hash"])
+                            successful_transfers += len(batch)
+                            total_sent += batch_amount
+                            fees_paid += transaction["fees_ton"]
+                            transfer_successful = True
+                        else:
+                            last_error = describe_failure(transaction)
+                            journal.failed("disperse", [recipient for recipient, _ in batch], last_error)
+                        break
+
+                except Exception as tx_error:
+                    last_error = f"Exception during transfer attempt: {str(tx_error)}"
+
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(1) # Small delay between retries
+
+            if not transfer_successful:
+                print(f"  ❌ Batch failed after {max_retries} attempts: {last_error}")
+            
+        except Exception as e:
+            print(f"  ❌ Batch failed: {str(e)}")
     
+    return {"successful_transfers": successful_transfers, "total_sent": total_sent, "fees_paid": fees_paid}
+
+
+async def _disperse_plan(plan_seed: int, wallets_file: str,
+                         journal: Optional[RunJournal] = None) -> AsyncIterator[List[Tuple[int, str, float]]]:
+    """Stream recipients as chunks of (index, address, amount); the same plan_seed replays the same amounts.
+
+    Recipients the journal has already settled are left out.
+    """
+    rng = random.Random(plan_seed)
+    async for chunk in iter_wallet_chunks(start=1, path=wallets_file):
+        planned = [
+            (index, address, round(rng.uniform(DISPERSE_TON_AMOUNT[0], DISPERSE_TON_AMOUNT[1]), 6))
+            for index, (address, _wallet) in chunk
+        ]
+        if journal is not None:
+            planned = [item for item in planned if not journal.is_settled("disperse", item[1])]
+        yield planned
+
+
+async def transfer_from_one_to_another(wallets_file: str = "wallets.txt", auto_confirm: bool = False,
+                                       run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Transfer TON from first wallet to all other wallets; run_id resumes an interrupted run"""
+    journal = None
+    plan_seed = random.getrandbits(64)
+    if run_id:
+        try:
+            journal = resume_run("disperse", run_id)
+        except (OSError, ValueError) as e:
+            return command_error(f"❌ {e}")
+        wallets_file = journal.params["wallets_file"]
+        plan_seed = journal.params["plan_seed"]
+
+    seeds = await load_first_seeds(2, wallets_file)
+
+    if len(seeds) < 2:
+        return command_error("Need at least 2 wallets for transfers")
+
     # Get main wallet (first seed)
-    main_seed = seeds[0]
-    main_address, main_wallet = await create_wallet_from_seed(main_seed)
-    
+    if USE_HIGHLOAD_WALLET:
+        main_address, main_wallet = await create_highload_wallet(seeds[0])
+        print("Using the highload wallet as the main wallet")
+    else:
+        main_address, main_wallet = await create_wallet_from_seed(seeds[0])
+
     print(f"Main wallet address: {main_address}")
-    
+
     # Get main wallet balance
     main_balance_info = await get_wallet_balance(main_address)
     if not main_balance_info["success"]:
-        print(f"Error getting main wallet balance: {main_balance_info['error']}")
-        return
-    
+        return command_error(f"Error getting main wallet balance: {main_balance_info['error']}")
+
     main_balance = main_balance_info["balance_ton"]
     print(f"Main wallet balance: {main_balance:.4f} TON")
-    
+
     if main_balance_info["status"] != "active":
-        print("Main wallet is not active! Cannot send transactions.")
-        return
-    
-    # Get recipient wallets (all except first)
-    recipient_wallets = []
-    transfer_amounts = []
-    
+        return command_error("Main wallet is not active! Cannot send transactions.")
+
+    if journal is not None:
+        await resolve_in_doubt(journal)
+
+    # Recipients are streamed twice (plan, then send), so amounts come from a replayable generator
+    batch_size = highload_batch_size() if USE_HIGHLOAD_WALLET else V4_MAX_MESSAGES
+    recipient_count = 0
+    total_batches = 0
+    total_to_send = 0
+    min_amount = None
+
     print(f"\nGenerating random transfer amounts using range {DISPERSE_TON_AMOUNT[0]:.3f} - {DISPERSE_TON_AMOUNT[1]:.3f} TON...")
-    print(f"\nRecipient wallets ({len(seeds) - 1} wallets):")
-    
-    for i, seed in enumerate(seeds[1:], 1):
-        address, wallet = await create_wallet_from_seed(seed)
-        recipient_wallets.append({"wallet": wallet, "address": address})
-        
-        # Generate random amount within the specified range
-        amount = round(random.uniform(DISPERSE_TON_AMOUNT[0], DISPERSE_TON_AMOUNT[1]), 6)
-        transfer_amounts.append(amount)
-        
-        print(f"Wallet #{i}: {address}")
-        print(f"  → Amount to send: {amount:.6f} TON")
-    
+    print(f"\nRecipient wallets:")
+
+    async for chunk in _disperse_plan(plan_seed, wallets_file, journal):
+        for index, address, amount in chunk:
+            print(f"Wallet #{index}: {address}")
+            print(f"  → Amount to send: {amount:.6f} TON")
+            total_to_send += amount
+            min_amount = amount if min_amount is None else min(min_amount, amount)
+        recipient_count += len(chunk)
+        total_batches += math.ceil(len(chunk) / batch_size)
+
+    if not recipient_count:
+        print("\n✅ Every recipient of this run has already been paid!")
+        result = {"success": True, "recipients": 0, "successful_transfers": 0, "total_sent": 0}
+        if journal is not None:
+            journal.finish(result)
+            journal.close()
+        return result
+
     # Calculate total needed
-    total_to_send = sum(transfer_amounts)
     fee_per_transfer = 0.001
-    total_fees = fee_per_transfer * len(transfer_amounts)
+    total_fees = fee_per_transfer * recipient_count
     total_needed = total_to_send + total_fees
-    
+
     print(f"\n📋 Transfer Summary:")
     print("=" * 50)
-    for i, (recipient, amount) in enumerate(zip(recipient_wallets, transfer_amounts), 1):
-        print(f"Wallet #{i}: {amount:.6f} TON → {recipient['address'][:10]}...{recipient['address'][-6:]}")
-    print("=" * 50)
+    print(f"👛 Recipient wallets: {recipient_count}")
     print(f"💰 Total to send: {total_to_send:.6f} TON")
     print(f"🎯 Total needed: {total_needed:.6f} TON")
     print(f"💳 Main wallet balance: {main_balance:.4f} TON")
     print("=" * 50)
-    
+
     # Check if enough balance
-    if main_balance < min(transfer_amounts) + fee_per_transfer:
-        print("\n❌ Not enough balance to send even the smallest transfer!")
-        return
-    
+    if main_balance < min_amount + fee_per_transfer:
+        return command_error("\n❌ Not enough balance to send even the smallest transfer!")
+
     if main_balance < total_needed:
         print(f"\n⚠️  Warning: Not enough balance for all transfers!")
         print(f"You need {total_needed:.4f} TON but only have {main_balance:.4f} TON")
-        
-        proceed = input("Do you want to proceed anyway? (y/n): ").lower().strip()
-        if proceed != 'y':
-            print("Transfer cancelled.")
-            return
+
+        if not confirm("Do you want to proceed anyway? (y/n): ", auto_confirm):
+            return command_error("Transfer cancelled.")
     else:
         print(f"\n✅ Sufficient balance for all transfers!")
-    
-    # Confirm before proceeding
-    proceed = input("Proceed with transfers? (y/n): ").lower().strip()
-    if proceed != 'y':
-        print("Transfer cancelled.")
-        return
-    
-    print("\n🚀 Starting transfers...")
-    
-    # Perform transfers
-    successful_transfers = 0
-    total_sent = 0
-    
-    for i, (recipient, amount) in enumerate(zip(recipient_wallets, transfer_amounts)):
-        try:
-            print(f"\nTransfer #{i+1}:")
-            print(f"  To: {recipient['address']}")
-            print(f"  Amount: {amount:.4f} TON")
-            
-            # Check if we still have enough balance for this transfer
-            current_balance_info = await get_wallet_balance(main_address)
-            if current_balance_info["success"]:
-                current_balance = current_balance_info["balance_ton"]
-                if current_balance < amount + fee_per_transfer:
-                    print(f"  ❌ Insufficient balance for this transfer (need {amount + fee_per_transfer:.6f} TON, have {current_balance:.4f} TON)")
-                    continue
-            
-            print(f"  🔄 Sending {amount:.4f} TON...")
-
-            max_retries = 5
-            transfer_successful = False
-            last_error = "Unknown error"
 
-            for attempt in range(max_retries):
-                try:
-                    # Get current seqno for the main wallet. Must be fresh for each attempt.
-                    seqno_result = await get_wallet_seqno(main_address)
-                    if not seqno_result["success"]:
-                        last_error = f"Failed to get seqno: {seqno_result.get('error', 'N/A')}"
-                        await asyncio.sleep(1)
-                        continue
-                    
-                    seqno = seqno_result["seqno"]
-                    
-                    boc = await create_transfer_transaction(
-                        main_wallet, recipient["address"], amount, seqno
-                    )
-                    
-                    send_result = await send_transaction_boc(boc)
-                    
-                    if send_result["success"]:
-                        print(f"  ✅ Transfer transaction sent! Waiting for confirmation...")
-                        print(f"  💳 Transaction: {send_result.get('explorer_link', 'N/A')}")
-                        
-                        confirmed = await await_seqno_increment(main_address, seqno)
-                        if confirmed:
-                            print("  🎉 Transaction confirmed on the blockchain!")
-                            successful_transfers += 1
-                            total_sent += amount
-                            transfer_successful = True
-                        else:
-                            print("  ❌ Transaction was sent but confirmation timed out.")
-                            last_error = "Confirmation timeout"
+    # Confirm before proceeding
+    if not confirm("Proceed with transfers? (y/n): ", auto_confirm):
+        return command_error("Transfer cancelled.")
 
-                        break # Exit retry loop
-                    else:
-                        last_error = send_result.get('error', 'Unknown send error')
+    if journal is None:
+        journal = RunJournal.create("disperse", wallets_file=wallets_file, highload=USE_HIGHLOAD_WALLET, plan_seed=plan_seed)
 
-                except Exception as tx_error:
-                    last_error = f"Exception during transfer attempt: {str(tx_error)}"
+    print("\n🚀 Starting transfers...")
 
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(1) # Small delay between retries
+    successful_transfers = 0
+    total_sent = 0
+    fees_paid = 0
+    batch_offset = 0
+    async for chunk in _disperse_plan(plan_seed, wallets_file, journal):
+        transfers = [(address, amount) for _index, address, amount in chunk]
+        journal.planned("disperse", transfers)
+        if USE_HIGHLOAD_WALLET:
+            result = await send_highload_transfers(
+                main_wallet, main_address, transfers, batch_offset, total_batches, journal=journal, op="disperse"
+            )
+        else:
+            result = await _send_v4_batches(
+                main_wallet, main_address, transfers, fee_per_transfer, journal, batch_offset, total_batches
+            )
+        successful_transfers += result["successful_transfers"]
+        total_sent += result["total_sent"]
+        fees_paid += result["fees_paid"]
+        batch_offset += math.ceil(len(transfers) / batch_size)
 
-            if not transfer_successful:
-                print(f"  ❌ Transfer failed after {max_retries} attempts: {last_error}")
-            
-        except Exception as e:
-            print(f"  ❌ Transfer failed: {str(e)}")
-    
     print(f"\n📊 Transfer Summary:")
-    print(f"Successful transfers: {successful_transfers}/{len(transfer_amounts)}")
+    print(f"Successful transfers: {successful_transfers}/{recipient_count}")
     print(f"Total sent: {total_sent:.4f} TON")
-    print(f"Estimated fees paid: {successful_transfers * fee_per_transfer:.6f} TON")
-    
+    print(f"Fees paid: {fees_paid:.6f} TON")
+
     if successful_transfers > 0:
         print("🎉 Transfers completed!")
     else:
         print("❌ No transfers were successful.")
 
+    result = {
+        "success": successful_transfers > 0,
+        "recipients": recipient_count,
+        "successful_transfers": successful_transfers,
+        "total_sent": round(total_sent, 9),
+        "fees_paid": round(fees_paid, 9)
+    }
+    journal.finish(result)
+    journal.close()
+    return result
 
-async def _transfer_from_single_wallet(wallet_info: Dict[str, Any], main_address: str, amount: float) -> Dict[str, Any]:
+
+async def _transfer_from_single_wallet(wallet_info: Dict[str, Any], main_address: str, amount: float,
+                                      journal: RunJournal) -> Dict[str, Any]:
     """Handles the transfer logic from a single wallet to the main address."""
     try:
         if amount <= 0:
@@ -188,41 +311,76 @@ async def _transfer_from_single_wallet(wallet_info: Dict[str, Any], main_address
         
         print(f"  🔄 Sending {amount:.6f} TON...")
 
+        affected = [wallet_info["address"], main_address]
         max_retries = 5
         last_error = "Unknown error"
+        signed = None
+        fresh_seqno = False
 
         for attempt in range(max_retries):
             try:
-                seqno_result = await get_wallet_seqno(wallet_info["address"])
-                if not seqno_result["success"]:
-                    last_error = f"Failed to get seqno: {seqno_result.get('error', 'N/A')}"
-                    await asyncio.sleep(1)
-                    continue
-                
-                seqno = seqno_result["seqno"]
-                
-                boc = await create_transfer_transaction(
-                    wallet_info["wallet"], main_address, amount, seqno
-                )
-                
-                send_result = await send_transaction_boc(boc)
-                
-                if send_result["success"]:
-                    print(f"  ✅ Transfer transaction sent from wallet #{wallet_info['index']}! Waiting for confirmation...")
-                    print(f"  💳 Transaction: {send_result.get('explorer_link', 'N/A')}")
-                    
-                    confirmed = await await_seqno_increment(wallet_info["address"], seqno)
-                    if confirmed:
-                        print(f"  🎉 Transaction from wallet #{wallet_info['index']} confirmed!")
-                        return {"success": True, "amount": amount}
+                transaction = None
+                if signed is not None:
+                    # A retry looks the signed message up by hash; only a message that can no longer land is re-signed.
+                    # A rejected rebroadcast may mean an earlier copy landed, so that waits for the hash or expiry
+                    check = await signed.recheck(wait=signed.refused)
+                    if not check["success"]:
+                        last_error = f"Failed to look up the previous attempt: {check.get('error', 'N/A')}"
+                        await asyncio.sleep(1)
+                        continue
+                    if check["state"] == "included":
+                        print(f"  🎉 Transaction from wallet #{wallet_info['index']} landed on a previous attempt!")
+                        transaction = check["transaction"]
+                        invalidate_states(affected)
+                    elif check["state"] == "expired":
+                        signed = None
+
+                if transaction is None:
+                    if signed is None:
+                        seqno_result = await (get_wallet_seqno(wallet_info["address"]) if fresh_seqno
+                                              else seqno_tracker.next_seqno(wallet_info["address"]))
+                        if not seqno_result["success"]:
+                            last_error = f"Failed to get seqno: {seqno_result.get('error', 'N/A')}"
+                            await asyncio.sleep(1)
+                            continue
+                        boc = await create_transfer_transaction(
+                            wallet_info["wallet"], main_address, amount, seqno_result["seqno"]
+                        )
+                        signed = SignedMessage(wallet_info["address"], seqno_result["seqno"], boc)
+                        journal.sent("collect", [wallet_info["address"]], wallet_info["address"],
+                                     seqno=signed.seqno, valid_until=signed.expires_at, message_hash=signed.hash)
+
+                    # While the message can still land, a retry rebroadcasts the same BOC
+                    send_result = await send_transaction_boc(signed.boc, affected)
+                    signed.record_send(send_result)
+                    if send_result["success"]:
+                        print(f"  ✅ Transfer transaction sent from wallet #{wallet_info['index']}! Waiting for confirmation...")
+                        transaction = await await_message(signed.hash, affected=affected)
+                        if transaction is None:
+                            print(f"  ❌ Transaction from wallet #{wallet_info['index']} was sent but confirmation timed out.")
+                            last_error = "Confirmation timeout"
+                            seqno_tracker.forget(wallet_info["address"])
+                            break
                     else:
-                        print(f"  ❌ Transaction from wallet #{wallet_info['index']} was sent but confirmation timed out.")
-                        last_error = "Confirmation timeout"
-                    
+                        last_error = send_result.get('error', 'Unknown send error')
+                        seqno_tracker.forget(wallet_info["address"])
+                        if signed.refused and not signed.broadcast:
+                            # Rejected without ever being broadcast (e.g. a stale seqno): sign again with the network's seqno
+                            signed = None
+                            fresh_seqno = True
+                        print(f"  Attempt {attempt + 1}/{max_retries} for wallet #{wallet_info['index']} failed: {last_error}")
+
+                if transaction is not None:
+                    signed.landed()
+                    if transaction["success"]:
+                        print(f"  🎉 Transaction from wallet #{wallet_info['index']} confirmed!")
+                        print(f"  💳 Transaction: {transaction['explorer_link']} (fees {transaction['fees_ton']:.6f} TON)")
+                        journal.confirmed("collect", [wallet_info["address"]], tx_hash=transaction["hash"])
+                        return {"success": True, "amount": amount, "fees": transaction["fees_ton"]}
+                    last_error = describe_failure(transaction)
+                    print(f"  ❌ Transaction from wallet #{wallet_info['index']} landed but failed.")
+                    journal.failed("collect", [wallet_info["address"]], last_error)
                     break
-                else:
-                    last_error = send_result.get('error', 'Unknown send error')
-                    print(f"  Attempt {attempt + 1}/{max_retries} for wallet #{wallet_info['index']} failed: {last_error}")
 
             except Exception as tx_error:
                 last_error = f"Exception during transfer attempt: {str(tx_error)}"
@@ -240,93 +398,128 @@ async def _transfer_from_single_wallet(wallet_info: Dict[str, Any], main_address
         return {"success": False, "error": error_msg, "amount": 0}
 
 
-async def transfer_from_all_to_one() -> None:
-    """Transfer TON from all wallets to the first wallet"""
-    seeds = await load_seeds()
-    
+async def _plan_collection_chunk(chunk: List[Tuple[int, Any]], fee_per_transfer: float, verbose: bool,
+                                 journal: Optional[RunJournal] = None) -> List[Dict[str, Any]]:
+    """Query one chunk of sender wallets and return the transfers to collect from it, leaving out settled ones"""
+    if journal is not None:
+        chunk = [item for item in chunk if not journal.is_settled("collect", item[1][0])]
+    states = await get_wallet_states([address for _index, (address, _wallet) in chunk])
+    transfers_to_process = []
+
+    for i, (address, wallet) in chunk:
+        balance_info = states[address]
+        if balance_info["success"]:
+            balance = balance_info["balance_ton"]
+            status = balance_info["status"]
+            amount_to_send = max(0, balance - fee_per_transfer * 2)
+
+            if status == "active" and balance > 0.001 and amount_to_send > 0:
+                wallet_info = {"wallet": wallet, "address": address, "balance": balance, "index": i}
+                transfers_to_process.append({"wallet_info": wallet_info, "amount": amount_to_send})
+                if verbose:
+                    print(f"Wallet #{i}: {address} ({balance:.6f} TON) - Will be collected.")
+            elif verbose:
+                print(f"Wallet #{i}: {address} - Skipped (status: {status}, balance: {balance:.6f} TON)")
+
+    return transfers_to_process
+
+
+async def transfer_from_all_to_one(wallets_file: str = "wallets.txt", auto_confirm: bool = False,
+                                   run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Transfer TON from all wallets to the first wallet; run_id resumes an interrupted run"""
+    journal = None
+    if run_id:
+        try:
+            journal = resume_run("collect", run_id)
+        except (OSError, ValueError) as e:
+            return command_error(f"❌ {e}")
+        wallets_file = journal.params["wallets_file"]
+
+    seeds = await load_first_seeds(2, wallets_file)
+
     if len(seeds) < 2:
-        print("Need at least 2 wallets for transfers")
-        return
-    
-    main_seed = seeds[0]
-    main_address, _ = await create_wallet_from_seed(main_seed)
-    
+        return command_error("Need at least 2 wallets for transfers")
+
+    main_address, _ = await create_wallet_from_seed(seeds[0])
+
     print(f"Target wallet address: {main_address}")
-    
+
     main_balance_info = await get_wallet_balance(main_address)
     if main_balance_info["success"]:
         print(f"Target wallet balance: {main_balance_info['balance_ton']:.4f} TON")
-    
-    sender_wallets = []
-    
-    print(f"\nScanning sender wallets ({len(seeds) - 1} wallets):")
-    
-    for i, seed in enumerate(seeds[1:], 1):
-        address, wallet = await create_wallet_from_seed(seed)
-        
-        balance_info = await get_wallet_balance(address)
-        if balance_info["success"]:
-            balance = balance_info["balance_ton"]
-            status = balance_info["status"]
-            
-            if status == "active" and balance > 0.001:
-                sender_wallets.append({
-                    "wallet": wallet, 
-                    "address": address, 
-                    "balance": balance,
-                    "index": i
-                })
-                print(f"Wallet #{i}: {address} ({balance:.6f} TON) - Will be collected.")
-            else:
-                print(f"Wallet #{i}: {address} - Skipped (status: {status}, balance: {balance:.6f} TON)")
-    
-    if not sender_wallets:
-        print("\n❌ No wallets with sufficient balance found to collect from!")
-        return
-    
+
+    if journal is not None:
+        await resolve_in_doubt(journal)
+
     fee_per_transfer = 0.001
-    transfers_to_process = []
+    transfers_count = 0
     total_to_collect = 0
-    
-    for wallet_info in sender_wallets:
-        amount_to_send = max(0, wallet_info["balance"] - fee_per_transfer * 2)
-        if amount_to_send > 0:
-            transfers_to_process.append({"wallet_info": wallet_info, "amount": amount_to_send})
-            total_to_collect += amount_to_send
-            
-    if not transfers_to_process:
-        print("\n❌ No TON to transfer after calculating fees!")
-        return
+
+    print(f"\nScanning sender wallets:")
+
+    # Scan the file once to show the plan; balances are re-read chunk by chunk when sending
+    async for chunk in iter_wallet_chunks(start=1, path=wallets_file):
+        for transfer in await _plan_collection_chunk(chunk, fee_per_transfer, True, journal):
+            transfers_count += 1
+            total_to_collect += transfer["amount"]
+
+    if not transfers_count and journal is not None:
+        print("\n✅ Every wallet of this run has already been collected!")
+        result = {"success": True, "senders": 0, "successful_transfers": 0, "total_collected": 0}
+        journal.finish(result)
+        journal.close()
+        return result
+
+    if not transfers_count:
+        return command_error("\n❌ No wallets with sufficient balance found to collect from!")
 
     print(f"\n📋 Collection Summary:")
     print("=" * 50)
-    for transfer in transfers_to_process:
-        wallet_info = transfer["wallet_info"]
-        amount = transfer["amount"]
-        print(f"Wallet #{wallet_info['index']}: {amount:.6f} TON from {wallet_info['address'][:10]}...{wallet_info['address'][-6:]}")
-    print("=" * 50)
+    print(f"👛 Wallets to collect from: {transfers_count}")
     print(f"💰 Total to collect: {total_to_collect:.6f} TON")
     print(f"💳 Target wallet: {main_address}")
     print("=" * 50)
-    
-    proceed = input("Proceed with collecting transfers? (y/n): ").lower().strip()
-    if proceed != 'y':
-        print("Transfer cancelled.")
-        return
-    
+
+    if not confirm("Proceed with collecting transfers? (y/n): ", auto_confirm):
+        return command_error("Transfer cancelled.")
+
+    if journal is None:
+        journal = RunJournal.create("collect", wallets_file=wallets_file)
+
     print("\n🚀 Starting collection transfers concurrently...")
-    
-    tasks = [_transfer_from_single_wallet(t["wallet_info"], main_address, t["amount"]) for t in transfers_to_process]
-    results = await asyncio.gather(*tasks)
 
-    successful_transfers = sum(1 for r in results if r.get("success"))
-    total_collected = sum(r.get("amount", 0) for r in results if r.get("success"))
-    
+    successful_transfers = 0
+    total_collected = 0
+    fees_paid = 0
+    async for chunk in iter_wallet_chunks(start=1, path=wallets_file):
+        transfers_to_process = await _plan_collection_chunk(chunk, fee_per_transfer, False, journal)
+        journal.planned("collect", [(t["wallet_info"]["address"], t["amount"]) for t in transfers_to_process])
+        results = await run_bounded(
+            lambda t: _transfer_from_single_wallet(t["wallet_info"], main_address, t["amount"], journal),
+            transfers_to_process,
+            send_limit.limit
+        )
+        successful_transfers += sum(1 for r in results if r.get("success"))
+        total_collected += sum(r.get("amount", 0) for r in results if r.get("success"))
+        fees_paid += sum(r.get("fees", 0) for r in results if r.get("success"))
+
     print(f"\n📊 Collection Summary:")
-    print(f"Successful transfers: {successful_transfers}/{len(transfers_to_process)}")
+    print(f"Successful transfers: {successful_transfers}/{transfers_count}")
     print(f"Total collected: {total_collected:.6f} TON")
-    
+    print(f"Fees paid: {fees_paid:.6f} TON")
+
     if successful_transfers > 0:
         print("🎉 Collection completed!")
     else:
         print("❌ No transfers were successful.")
+
+    result = {
+        "success": successful_transfers > 0,
+        "senders": transfers_count,
+        "successful_transfers": successful_transfers,
+        "total_collected": round(total_collected, 9),
+        "fees_paid": round(fees_paid, 9)
+    }
+    journal.finish(result)
+    journal.close()
+    return result
@@ -1,71 +1,808 @@
-import aiohttp
 import asyncio
 import base64
-from typing import List, Dict, Tuple, Optional
+import decimal
+import itertools
+import mmap
+import os
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Dict, Tuple, Optional
+from tonsdk.boc import Cell
+from tonsdk.contract import Contract
 from tonsdk.crypto import mnemonic_new
 from tonsdk.contract.wallet import Wallets, WalletVersionEnum
-from tonsdk.utils import bytes_to_b64str
-from config import RPC_API
+from tonsdk.utils import Address, bytes_to_b64str, b64str_to_bytes
+from config import (
+    RPC_API, TONCENTER_API, RPC_ENDPOINTS, RPC_HEDGE_DELAY, RPC_FAILURES_BEFORE_DOWN, RPC_DOWN_SECONDS,
+    HTTP_POOL_SIZE, HTTP_KEEPALIVE, HTTP_TIMEOUT, DERIVE_POOL, DERIVE_WORKERS,
+    STATE_BATCH_SIZE, RPC_RPS, RPC_BURST, RPC_MAX_429_RETRIES, THREADS, SEND_THREADS,
+    SEED_CHUNK_SIZE, SEED_FILE_MMAP, GENERATE_BATCH_SIZE, GENERATE_WITH_KEYS, KEY_CACHE_ENABLED, SEQNO_CACHE_TTL,
+    STATE_CACHE_TTL
+)
+from .key_cache import KeyCache, attach_key_cache, get_key_cache
+from . import metrics
+from .metrics import instrumented
 
+if TYPE_CHECKING:
+    import aiohttp
 
-async def load_seeds() -> List[str]:
-    """Load seeds from wallets.txt file"""
+
+# A v4r2 wallet executes at most 4 outgoing messages per external message
+V4_MAX_MESSAGES = 4
+
+# tonsdk signs v4 messages with valid_until = now + 60 s (seqno 0 messages never expire)
+V4_MESSAGE_TTL = 60
+
+# Seconds after valid_until a landed message may still be missing from the toncenter index
+MESSAGE_INDEX_GRACE = 30
+
+
+class HttpClient:
+    """Process-wide pooled aiohttp session with keep-alive and request timeouts"""
+
+    def __init__(self, pool_size: int, keepalive: float, timeout: float):
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_session(self) -> "aiohttp.ClientSession":
+        """Return the shared session, opening it on first use in the running loop"""
+        import aiohttp  # Deferred: commands that never touch the network skip its import cost
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._loop = loop
+        return self._session
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> Tuple[int, Any, Dict]:
+        """Perform a request and return (status, body, headers); body is parsed JSON on HTTP 200, text otherwise"""
+        import aiohttp
+
+        session = self.get_session()
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        async with session.request(method, url, **kwargs) as response:
+            if response.status == 200:
+                return response.status, await response.json(), response.headers
+            return response.status, await response.text(), response.headers
+
+    async def close(self) -> None:
+        """Close the shared session and release pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+class RateLimiter:
+    """Token bucket shared by every toncenter request; slows down on HTTP 429 and recovers gradually"""
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent; waiters are served in arrival order"""
+        async with self._get_lock():
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self) -> None:
+        """Additive recovery towards the configured rate after a throttle"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.02)
+
+    def on_throttled(self, retry_after: float) -> None:
+        """Pause everyone for Retry-After and cut the rate after an HTTP 429"""
+        self.rate = max(self.max_rate * 0.1, self.rate * 0.7)
+        self.tokens = 0.0
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+def _retry_after_seconds(headers: Dict, default: float = 1.0) -> float:
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    value = headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class ConcurrencyLimit:
+    """Async context manager capping how many holders run at once (semaphore bound to the running loop)"""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._loop = loop
+        return self._semaphore
+
+    async def __aenter__(self):
+        await self._get_semaphore().acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+
+class RpcEndpoint:
+    """One toncenter-compatible endpoint with its own API key, rate limiter, latency and health record.
+
+    Endpoints that share an API key also share its rate limit: pass them the same rate_limiter.
+    """
+
+    def __init__(self, url: str, api_key: str = "", rps: float = RPC_RPS, burst: int = RPC_BURST,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.url = url.rstrip("/")
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter or RateLimiter(rps, burst)
+        self.latency = 0.0   # smoothed round trip; 0 until measured, so every endpoint gets tried early on
+        self.waiting = 0     # requests queued for a rate-limit token
+        self.failures = 0
+        self.down_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def score(self) -> float:
+        """Expected seconds until an answer: smoothed latency plus the wait for a rate-limit token"""
+        limiter = self.rate_limiter
+        now = time.monotonic()
+        tokens = min(limiter.burst, limiter.tokens + (now - limiter.updated) * limiter.rate)
+        wait = max(0.0, limiter.paused_until - now) + max(0.0, self.waiting + 1 - tokens) / limiter.rate
+        return self.latency + wait
+
+    def observe_latency(self, elapsed: float) -> None:
+        self.latency = elapsed if not self.latency else 0.8 * self.latency + 0.2 * elapsed
+        metrics.rpc_latency.set(self.latency, url=self.url)
+
+    def record_success(self, elapsed: float) -> None:
+        self.observe_latency(elapsed)
+        self.failures = 0
+
+    def record_failure(self, elapsed: float) -> None:
+        """Count an error or 5xx; enough of them in a row take the endpoint out of rotation for a while"""
+        self.observe_latency(elapsed)
+        self.failures += 1
+        if self.failures >= RPC_FAILURES_BEFORE_DOWN:
+            down_for = min(300, RPC_DOWN_SECONDS * 2 ** (self.failures - RPC_FAILURES_BEFORE_DOWN))
+            self.down_until = time.monotonic() + down_for
+            print(f"⚠️ RPC endpoint {self.url} failed {self.failures} times in a row, skipping it for {down_for}s")
+
+
+class RpcPool:
+    """The configured endpoints; requests go to the healthy one expected to answer first"""
+
+    def __init__(self, endpoints: List[RpcEndpoint]):
+        self.endpoints = endpoints
+
+    def pick(self, exclude: Optional[RpcEndpoint] = None) -> Optional[RpcEndpoint]:
+        """Best endpoint other than exclude; when all are down, the one that comes back first"""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint is not exclude]
+        if not candidates:
+            return None
+        healthy = [endpoint for endpoint in candidates if endpoint.healthy]
+        if not healthy:
+            return min(candidates, key=lambda endpoint: endpoint.down_until)
+        return min(healthy, key=lambda endpoint: endpoint.score())
+
+
+def _configured_endpoints() -> List[RpcEndpoint]:
+    if RPC_ENDPOINTS:
+        return [
+            RpcEndpoint(entry["url"], entry.get("api_key", ""), entry.get("rps", RPC_RPS), entry.get("burst", RPC_BURST))
+            for entry in RPC_ENDPOINTS
+        ]
+    # Comma-separated URLs all use RPC_API, so they draw from one rate limit
+    rate_limiter = RateLimiter(RPC_RPS, RPC_BURST)
+    return [RpcEndpoint(url.strip(), RPC_API, rate_limiter=rate_limiter) for url in TONCENTER_API.split(",") if url.strip()]
+
+
+http_client = HttpClient(HTTP_POOL_SIZE, HTTP_KEEPALIVE, HTTP_TIMEOUT)
+rpc_pool = RpcPool(_configured_endpoints())
+read_limit = ConcurrencyLimit(THREADS)
+send_limit = ConcurrencyLimit(SEND_THREADS)
+
+
+async def run_bounded(func: Callable[[Any], Awaitable[Any]], items: Iterable, limit: int) -> List[Any]:
+    """Run func over items with a fixed number of workers; results keep the input order.
+
+    If func raises (or the caller is cancelled), the other workers are cancelled and the exception
+    propagates; no partial results are returned.
+    """
+    results: List[Any] = []
+    source = iter(enumerate(items))
+
+    async def worker():
+        for index, item in source:
+            result = await func(item)
+            if index >= len(results):
+                results.extend([None] * (index + 1 - len(results)))
+            results[index] = result
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, limit))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    return results
+
+
+async def close_http_client() -> None:
+    """Shutdown hook: close the shared HTTP client"""
+    await http_client.close()
+
+
+async def api_request(method: str, path: str, params: Optional[Dict] = None,
+                      json: Optional[Dict] = None, timeout: Optional[float] = None) -> Tuple[int, Any]:
+    """Send a request to a toncenter v3 endpoint through the shared client; list values become repeated params"""
+    query = [
+        (key, value)
+        for key, values in (params or {}).items()
+        for value in (values if isinstance(values, list) else [values])
+    ]
+    
+    # Broadcasting messages and reading state have separate in-flight limits; only reads are hedged or failed over
+    is_read = path != "/message"
+    limit = read_limit if is_read else send_limit
+    
+    for attempt in range(RPC_MAX_429_RETRIES + 1):
+        queued_at = time.perf_counter()
+        async with limit:
+            endpoint = rpc_pool.pick()
+            hedge = is_read and RPC_HEDGE_DELAY > 0 and len(rpc_pool.endpoints) > 1
+            try:
+                if hedge:
+                    status, body, headers = await _hedged_request(endpoint, method, path, query, json, timeout, queued_at)
+                else:
+                    status, body, headers = await _endpoint_request(endpoint, method, path, query, json, timeout, queued_at)
+            except Exception:
+                # A read that got no answer at all is tried again on the next best endpoint
+                if is_read and len(rpc_pool.endpoints) > 1 and attempt < RPC_MAX_429_RETRIES:
+                    metrics.http_retries.inc(endpoint=path, reason="error")
+                    continue
+                raise
+        if status >= 500 and is_read and len(rpc_pool.endpoints) > 1 and attempt < RPC_MAX_429_RETRIES:
+            metrics.http_retries.inc(endpoint=path, reason="5xx")
+            continue
+        if status != 429:
+            break
+        if attempt < RPC_MAX_429_RETRIES:
+            metrics.http_retries.inc(endpoint=path, reason="429")
+    
+    return status, body
+
+
+async def _endpoint_request(endpoint: RpcEndpoint, method: str, path: str, query: List[Tuple[str, Any]],
+                            json: Optional[Dict], timeout: Optional[float], queued_at: float,
+                            sent: Optional[asyncio.Event] = None) -> Tuple[int, Any, Dict]:
+    """One request to one endpoint through its rate limiter, recording latency, health and metrics.
+
+    sent is set once the rate limiter let the request go out.
+    """
+    endpoint.waiting += 1
+    try:
+        await endpoint.rate_limiter.acquire()
+    finally:
+        endpoint.waiting -= 1
+    if sent is not None:
+        sent.set()
+    sent_at = time.perf_counter()
+    metrics.http_queue.observe(sent_at - queued_at, endpoint=path)
+    try:
+        status, body, headers = await http_client.request(
+            method, f"{endpoint.url}{path}", params=query + [("api_key", endpoint.api_key)], json=json, timeout=timeout
+        )
+    except asyncio.CancelledError:
+        # Lost a hedge race: the time so far is a lower bound of this endpoint's latency
+        endpoint.observe_latency(time.perf_counter() - sent_at)
+        metrics.rpc_requests.inc(url=endpoint.url, result="cancelled")
+        raise
+    except Exception:
+        elapsed = time.perf_counter() - sent_at
+        metrics.http_latency.observe(elapsed, endpoint=path)
+        metrics.http_requests.inc(endpoint=path, status="error")
+        metrics.rpc_requests.inc(url=endpoint.url, result="error")
+        endpoint.record_failure(elapsed)
+        raise
+    
+    elapsed = time.perf_counter() - sent_at
+    metrics.http_latency.observe(elapsed, endpoint=path)
+    metrics.http_requests.inc(endpoint=path, status=status)
+    if status == 429:
+        endpoint.rate_limiter.on_throttled(_retry_after_seconds(headers))
+        metrics.rpc_requests.inc(url=endpoint.url, result="throttled")
+    elif status >= 500:
+        endpoint.rate_limiter.on_success()
+        endpoint.record_failure(elapsed)
+        metrics.rpc_requests.inc(url=endpoint.url, result="server_error")
+    else:
+        endpoint.rate_limiter.on_success()
+        endpoint.record_success(elapsed)
+        metrics.rpc_requests.inc(url=endpoint.url, result="ok")
+    metrics.rpc_rate_limit.set(endpoint.rate_limiter.rate, url=endpoint.url)
+    return status, body, headers
+
+
+async def _hedged_request(primary: RpcEndpoint, method: str, path: str, query: List[Tuple[str, Any]],
+                          json: Optional[Dict], timeout: Optional[float], queued_at: float) -> Tuple[int, Any, Dict]:
+    """Send a read to the primary endpoint; if it has not answered RPC_HEDGE_DELAY after it went out, also send
+    it to the next best one and use whichever usable answer comes first"""
+    sent = asyncio.Event()
+    first = asyncio.ensure_future(_endpoint_request(primary, method, path, query, json, timeout, queued_at, sent))
+    # Time spent waiting for a rate-limit token does not count towards the hedge delay
+    waiting_to_send = asyncio.ensure_future(sent.wait())
+    try:
+        await asyncio.wait({first, waiting_to_send}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiting_to_send.cancel()
+    done, _ = await asyncio.wait({first}, timeout=RPC_HEDGE_DELAY)
+    backup = rpc_pool.pick(exclude=primary) if not done else None
+    if backup is None or not backup.healthy:
+        return await first
+
+    second = asyncio.ensure_future(_endpoint_request(backup, method, path, query, json, timeout, queued_at))
+    pending = {first, second}
+    try:
+        last = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last = task
+                if task.exception() is None and task.result()[0] < 500 and task.result()[0] != 429:
+                    metrics.hedged_requests.inc(winner="primary" if task is first else "hedge")
+                    return task.result()
+        # Neither answer is usable: return (or raise) the last one, as an unhedged request would
+        return last.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def confirm(prompt: str, auto_confirm: bool = False) -> bool:
+    """Ask a y/n question; auto_confirm answers yes and a closed stdin answers no"""
+    if auto_confirm:
+        print(f"{prompt}y (auto-confirmed)")
+        return True
     try:
-        with open("wallets.txt", "r") as f:
-            seeds = [seed.strip() for seed in f.readlines()]
-        return [seed for seed in seeds if seed]  # Filter empty lines
-    except FileNotFoundError:
+        return input(prompt).lower().strip() == 'y'
+    except EOFError:
+        return False
+
+
+def command_error(message: str) -> Dict[str, Any]:
+    """Print why a command stopped and return it as the command's result"""
+    print(message)
+    return {"success": False, "error": message.strip()}
+
+
+def set_concurrency(threads: Optional[int] = None, send_threads: Optional[int] = None) -> None:
+    """Override THREADS / SEND_THREADS for this process, e.g. from command-line flags"""
+    if threads is not None:
+        read_limit.limit = max(1, threads)
+        read_limit._semaphore = None
+    if send_threads is not None:
+        send_limit.limit = max(1, send_threads)
+        send_limit._semaphore = None
+
+
+def _read_seed_lines(path: str, use_mmap: bool = SEED_FILE_MMAP) -> Iterator[str]:
+    """Yield the non-empty, stripped lines of a wallet file one at a time"""
+    with open(path, "rb") as f:
+        mapped = None
+        lines: Iterable[bytes] = f
+        if use_mmap and os.fstat(f.fileno()).st_size > 0:  # mmap cannot map an empty file
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            lines = iter(mapped.readline, b"")
+        try:
+            for line in lines:
+                seed = line.decode("utf-8").strip()
+                if seed:
+                    yield seed
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+
+async def _attach_seed_source(path: str) -> bool:
+    """Attach the derived-key cache of a wallet file; False when the file does not exist"""
+    if not os.path.exists(path):
+        return False
+    # The cache only walks the file again when it changed since the last run; hashing every seed and
+    # pruning the database then takes a while on a big file, so it runs off the event loop
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, lambda: attach_key_cache(path, _read_seed_lines(path)))
+    return True
+
+
+async def iter_seed_chunks(path: str = "wallets.txt", size: int = SEED_CHUNK_SIZE,
+                           use_mmap: bool = SEED_FILE_MMAP) -> AsyncIterator[List[Tuple[int, str]]]:
+    """Lazily yield lists of up to size (index, seed) pairs; file reads run off the event loop"""
+    if not await _attach_seed_source(path):
+        return
+
+    lines = _read_seed_lines(path, use_mmap)
+    numbered = enumerate(lines)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, lambda: list(itertools.islice(numbered, size)))
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        lines.close()
+
+
+async def load_first_seeds(count: int, path: str = "wallets.txt") -> List[str]:
+    """Read only the first count seeds of a wallet file, e.g. the funding wallet"""
+    if not await _attach_seed_source(path):
         return []
+    lines = _read_seed_lines(path)
+    try:
+        return list(itertools.islice(lines, count))
+    finally:
+        lines.close()
+
+
+def _generate_seed_batch(count: int, words: int, with_keys: bool) -> List[Tuple[str, Optional[Tuple[str, bytes, bytes]]]]:
+    """Generate count seed phrases, optionally with their derived keys (runs in the worker pool)"""
+    batch = []
+    for _ in range(count):
+        seed = " ".join(mnemonic_new(words))
+        batch.append((seed, _derive_keys(seed) if with_keys else None))
+    return batch
+
+
+async def generate_seeds(number_of_seeds: int, filename: str, words: int = 24,
+                         with_keys: bool = GENERATE_WITH_KEYS) -> Dict[str, Any]:
+    """Generate seed phrases in the worker pool and stream them to a file as batches complete"""
+    loop = asyncio.get_running_loop()
+    executor = _get_derive_executor()
+    batch_sizes = iter(
+        [GENERATE_BATCH_SIZE] * (number_of_seeds // GENERATE_BATCH_SIZE)
+        + ([number_of_seeds % GENERATE_BATCH_SIZE] if number_of_seeds % GENERATE_BATCH_SIZE else [])
+    )
+    max_in_flight = _derive_worker_count() * 2
+    pending = set()
+    generated = 0
+    start_time = time.monotonic()
+
+    cache = KeyCache(f"{filename}.keys.db") if with_keys and KEY_CACHE_ENABLED else None
+    addresses_file = open(f"{filename}.addresses.csv", "w") if with_keys else None
+    try:
+        with open(filename, "w", buffering=1 << 20) as f:
+            if addresses_file is not None:
+                addresses_file.write("address,public_key\n")
 
+            while True:
+                # Keep every worker busy without queueing the whole job up front
+                for size in itertools.islice(batch_sizes, max_in_flight - len(pending)):
+                    pending.add(loop.run_in_executor(executor, _generate_seed_batch, size, words, with_keys))
+                if not pending:
+                    break
 
-async def generate_seeds(number_of_seeds: int, filename: str, words: int = 24) -> None:
-    """Generate seed phrases and save to a file"""
-    with open(filename, "w") as f:
-        for _ in range(number_of_seeds):
-            seed = " ".join(mnemonic_new(words))
-            f.write(seed + "\n")
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    batch = future.result()
+                    f.write("".join(f"{seed}\n" for seed, _keys in batch))
+                    if addresses_file is not None:
+                        addresses_file.write("".join(f"{keys[0]},{keys[1].hex()}\n" for _seed, keys in batch))
+                    if cache is not None:
+                        cache.put_many(batch)
+                    generated += len(batch)
+
+                rate = generated / max(time.monotonic() - start_time, 1e-6)
+                print(f"\r  🔑 Generated {generated}/{number_of_seeds} seeds ({rate:.0f}/s)", end="", flush=True)
+    finally:
+        for future in pending:
+            future.cancel()
+        if addresses_file is not None:
+            addresses_file.close()
+        if cache is not None:
+            cache.close()
+
+    print()
     print(f"✅ Generated {number_of_seeds} seed phrases and saved to {filename}")
+    if with_keys:
+        print(f"📇 Addresses and public keys saved to {filename}.addresses.csv")
+    return {"success": True, "generated": number_of_seeds, "file": filename}
+
+
+_derive_executor: Optional[Executor] = None
+
+
+def _derive_worker_count() -> int:
+    return DERIVE_WORKERS or os.cpu_count() or 1
+
+
+def _get_derive_executor() -> Executor:
+    """Return the key derivation pool, creating it on first use"""
+    global _derive_executor
+    if _derive_executor is None:
+        workers = _derive_worker_count()
+        if DERIVE_POOL == "process":
+            _derive_executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _derive_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="derive")
+    return _derive_executor
+
+
+def shutdown_derive_pool() -> None:
+    """Shutdown hook: drop queued derivations and wait for the workers to exit before the interpreter does"""
+    global _derive_executor
+    if _derive_executor is not None:
+        _derive_executor.shutdown(wait=True, cancel_futures=True)
+        _derive_executor = None
+
+
+def _derive_keys(seed: str) -> Tuple[str, bytes, bytes]:
+    """Derive v4r2 address and keypair from a seed (runs in the worker pool)"""
+    _mnemonics, pub_k, priv_k, wallet = Wallets.from_mnemonics(seed.split(), WalletVersionEnum.v4r2, 0)
+    return wallet.address.to_string(True, True, False), pub_k, priv_k
+
+
+def _derive_random_address() -> str:
+    """Derive the address of a freshly generated seed (runs in the worker pool)"""
+    seed_phrase = " ".join(mnemonic_new(24))
+    return _derive_keys(seed_phrase)[0]
+
+
+class LazyWallet:
+    """v4r2 wallet built from a known keypair; the contract object is only created on first use"""
+
+    def __init__(self, public_key: bytes, private_key: bytes):
+        self.public_key = public_key
+        self.private_key = private_key
+        self._contract = None
+
+    def __getattr__(self, name: str):
+        if self._contract is None:
+            self._contract = Wallets.ALL[WalletVersionEnum.v4r2](
+                public_key=self.public_key, private_key=self.private_key, wc=0
+            )
+        return getattr(self._contract, name)
+
+
+def wallet_from_keys(public_key: bytes, private_key: bytes) -> object:
+    """Build a v4r2 wallet object from an already derived keypair"""
+    return LazyWallet(public_key, private_key)
+
+
+@instrumented("derive_keys")
+async def derive_keys(seeds: List[str], return_exceptions: bool = False) -> List[Tuple[str, bytes, bytes]]:
+    """Derive (address, public key, private key) for many seeds, using the key cache and the worker pool"""
+    cache = get_key_cache()
+    cached = cache.get_many(seeds) if cache is not None else {}
+    missing = [seed for seed in seeds if seed not in cached]
+
+    derived = {}
+    if missing:
+        loop = asyncio.get_running_loop()
+        executor = _get_derive_executor()
+
+        async def derive(seed: str):
+            try:
+                return await loop.run_in_executor(executor, _derive_keys, seed)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        # Keep only a few seeds queued per worker instead of submitting the whole file at once
+        results = await run_bounded(derive, missing, _derive_worker_count() * 2)
+        derived = dict(zip(missing, results))
+        if cache is not None:
+            cache.put_many(
+                (seed, result) for seed, result in derived.items() if not isinstance(result, BaseException)
+            )
+
+    return [cached[seed] if seed in cached else derived[seed] for seed in seeds]
+
+
+async def create_wallets_from_seeds(seeds: List[str], return_exceptions: bool = False) -> List[Tuple[str, object]]:
+    """Create (address, wallet object) pairs for many seeds, deriving keys in the worker pool"""
+    results = await derive_keys(seeds, return_exceptions=return_exceptions)
+    return [
+        result if isinstance(result, BaseException) else (result[0], wallet_from_keys(result[1], result[2]))
+        for result in results
+    ]
 
 
 async def create_wallet_from_seed(seed: str) -> Tuple[str, object]:
     """Create wallet from seed phrase and return address and wallet object"""
-    mnemonics = seed.split()
-    _mnemonics, _pub_k, _priv_k, wallet = Wallets.from_mnemonics(mnemonics, WalletVersionEnum.v4r2, 0)
-    address = wallet.address.to_string(True, True, False)
-    return address, wallet
+    return (await create_wallets_from_seeds([seed]))[0]
+
 
+async def iter_wallet_chunks(start: int = 0, return_exceptions: bool = False,
+                             path: str = "wallets.txt") -> AsyncIterator[List[Tuple[int, Any]]]:
+    """Stream a wallet file as chunks of (index, (address, wallet)) from index start, deriving one chunk at a time"""
+    async for chunk in iter_seed_chunks(path):
+        chunk = [(index, seed) for index, seed in chunk if index >= start]
+        if not chunk:
+            continue
+        wallets = await create_wallets_from_seeds([seed for _, seed in chunk], return_exceptions=return_exceptions)
+        yield [(index, wallet) for (index, _), wallet in zip(chunk, wallets)]
 
+
+@instrumented("generate_random_address")
 async def generate_random_address() -> str:
     """Generate a new random wallet address"""
-    seed_phrase = " ".join(mnemonic_new(24))
-    mnemonics = seed_phrase.split()
-    _, _, _, wallet = Wallets.from_mnemonics(mnemonics, WalletVersionEnum.v4r2, 0)
-    return wallet.address.to_string(True, True, False)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_derive_executor(), _derive_random_address)
+
+
+class SeqnoTracker:
+    """Next seqno per wallet, learned from every seqno or wallet state read (confirmation polls included).
+
+    Sends take their seqno from here instead of asking the network. An entry is dropped after a
+    failed send or a confirmation timeout, and ages out after SEQNO_CACHE_TTL seconds; expired entries
+    are evicted as new ones come in, so a balance scan of many wallets does not pile up here.
+    """
+
+    def __init__(self, ttl: float = SEQNO_CACHE_TTL):
+        self.ttl = ttl
+        self._seqnos: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    def observe(self, address: str, seqno: int) -> None:
+        """Record a seqno seen on chain; a lagging read never moves an entry backwards"""
+        now = time.monotonic()
+        known = self._seqnos.get(address)
+        self._seqnos[address] = (max(seqno, known[0]) if known else seqno, now)
+        self._seqnos.move_to_end(address)
+        # Entries stay in observation order, so expired ones are trimmed from the front
+        while self._seqnos:
+            oldest = next(iter(self._seqnos.values()))
+            if now - oldest[1] < self.ttl:
+                break
+            self._seqnos.popitem(last=False)
+
+    def forget(self, address: str) -> None:
+        self._seqnos.pop(address, None)
+
+    async def next_seqno(self, address: str) -> Dict:
+        """The wallet's next seqno, from memory when fresh, otherwise from get_wallet_seqno"""
+        known = self._seqnos.get(address)
+        if known and time.monotonic() - known[1] < self.ttl:
+            metrics.seqno_lookups.inc(source="tracker")
+            return {"success": True, "seqno": known[0]}
+        metrics.seqno_lookups.inc(source="network")
+        return await get_wallet_seqno(address)
+
+
+seqno_tracker = SeqnoTracker()
+
+
+class StateCache:
+    """Recently read wallet states by address, plus single-flight for reads that are already in progress.
+
+    A state from walletStates (with seqno) also answers balance reads; a balance read only answers balance reads.
+    Entries age out after STATE_CACHE_TTL seconds and are dropped for every address our own sends touch.
+    """
+
+    def __init__(self, ttl: float = STATE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def get(self, address: str, need_seqno: bool = False) -> Optional[Dict]:
+        entry = self._entries.get(address)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            return None
+        if need_seqno and "seqno" not in entry[0]:
+            return None
+        return entry[0]
+
+    def put(self, address: str, state: Dict) -> None:
+        """Store a successful read; entries stay in read order, so expired ones are trimmed from the front"""
+        if not self.ttl or not state["success"]:
+            return
+        now = time.monotonic()
+        self._entries[address] = (state, now)
+        self._entries.move_to_end(address)
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if now - oldest[1] < self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+    def invalidate(self, addresses: Iterable[str]) -> None:
+        for address in addresses:
+            self._entries.pop(address, None)
+
+    def in_flight(self, kind: str, address: str) -> Optional[asyncio.Future]:
+        return self._in_flight.get((kind, address))
 
+    def start(self, kind: str, address: str) -> asyncio.Future:
+        """Register a read in progress; later identical reads await the returned future"""
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[(kind, address)] = future
+        return future
 
+    def finish(self, kind: str, address: str, future: asyncio.Future, state: Optional[Dict]) -> None:
+        """Publish the result of a read to everyone waiting on it (None = the read was abandoned)"""
+        if self._in_flight.get((kind, address)) is future:
+            del self._in_flight[(kind, address)]
+        if not future.done():
+            future.set_result(state)
+
+
+state_cache = StateCache()
+
+
+def invalidate_states(addresses: Iterable[str]) -> None:
+    """Forget cached states of addresses whose balance or seqno our own message changes"""
+    state_cache.invalidate(addresses)
+
+
+@instrumented("get_wallet_seqno")
 async def get_wallet_seqno(address: str) -> Dict:
     """Get sequence number for a wallet"""
     try:
-        url = f"https://toncenter.com/api/v3/wallet"
-        params = {
-            "address": address,
-            "api_key": RPC_API
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    seqno = data.get("seqno", 0)
-                    return {
-                        "success": True,
-                        "seqno": seqno
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"API Error: {response.status}"
-                    }
+        status, data = await api_request("GET", "/wallet", params={"address": address})
+        if status == 200:
+            seqno = data.get("seqno") or 0  # null for uninitialized wallets
+            seqno_tracker.observe(address, seqno)
+            return {
+                "success": True,
+                "seqno": seqno
+            }
+        else:
+            return {
+                "success": False,
+                "error": f"API Error: {status}"
+            }
                     
     except Exception as e:
         return {
@@ -74,42 +811,31 @@ async def get_wallet_seqno(address: str) -> Dict:
         }
 
 
-async def send_transaction_boc(boc: str) -> Dict:
-    """Send transaction BOC to the network"""
+@instrumented("send_transaction_boc")
+async def send_transaction_boc(boc: str, affected: Iterable[str] = ()) -> Dict:
+    """Send transaction BOC to the network; affected are the addresses whose cached state it makes stale"""
     try:
-        url = f"https://toncenter.com/api/v3/message"
-        params = {"api_key": RPC_API}
-        data = {"boc": boc}
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=data, params=params) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    
-                    if "result" in result or "message_hash" in result:
-                        b64_hash = result.get("result") or result.get("message_hash")
-                        try:
-                            # Standard base64 decode, then hex encode for explorer URL
-                            hex_hash = base64.b64decode(b64_hash).hex()
-                            explorer_link = f"https://tonviewer.com/transaction/{hex_hash}"
-                        except Exception:
-                            explorer_link = "N/A"
-                        
-                        return {
-                            "success": True,
-                            "explorer_link": explorer_link
-                        }
-                    else:
-                        return {
-                            "success": False,
-                            "error": result.get("error", "Unknown error")
-                        }
-                else:
-                    response_text = await response.text()
-                    return {
-                        "success": False,
-                        "error": f"HTTP {response.status}: {response_text}"
-                    }
+        status, result = await api_request("POST", "/message", json={"boc": boc})
+        if status == 200:
+            invalidate_states(affected)
+            if "result" in result or "message_hash" in result:
+                # The hash of the message, not of a transaction: the link comes once it is confirmed
+                return {
+                    "success": True,
+                    "message_hash": result.get("result") or result.get("message_hash")
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": result.get("error", "Unknown error")
+                }
+        else:
+            # Gateway errors and timeouts may hide a message that was broadcast; anything else refused it
+            return {
+                "success": False,
+                "error": f"HTTP {status}: {result}",
+                "rejected": status not in (429, 502, 503, 504)
+            }
                     
     except Exception as e:
         return {
@@ -118,39 +844,62 @@ async def send_transaction_boc(boc: str) -> Dict:
         }
 
 
-async def get_wallet_balance(address: str) -> Dict:
-    """Get balance and status for a TON wallet address"""
+@instrumented("get_wallet_balance")
+async def get_wallet_balance(address: str, fresh: bool = False) -> Dict:
+    """Get balance and status for a TON wallet address; fresh skips the state cache (for polling)"""
+    if not fresh:
+        cached = state_cache.get(address)
+        if cached is not None:
+            metrics.state_reads.inc(source="cache")
+            return _balance_view(cached)
+        shared = state_cache.in_flight("state", address) or state_cache.in_flight("balance", address)
+        if shared is not None:
+            state = await asyncio.shield(shared)
+            if state is not None:
+                metrics.state_reads.inc(source="shared")
+                return _balance_view(state)
+
+    metrics.state_reads.inc(source="network")
+    future = state_cache.start("balance", address)
+    result = None
     try:
-        url = f"https://toncenter.com/api/v3/addressInformation"
-        params = {
-            "address": address,
-            "api_key": RPC_API
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Parse balance and status
-                    balance_nano = data.get("balance", "0")
-                    balance_ton = float(balance_nano) / 1_000_000_000  # Convert nanoTON to TON
-                    status = data.get("status", "unknown")
-                    
-                    return {
-                        "success": True,
-                        "balance_ton": balance_ton,
-                        "balance_nano": balance_nano,
-                        "status": status,
-                        "data": data
-                    }
-                else:
-                    response_text = await response.text()
-                    return {
-                        "success": False,
-                        "error": f"API Error: {response.status}",
-                        "response_text": response_text
-                    }
+        result = await _fetch_wallet_balance(address)
+        state_cache.put(address, result)
+        return result
+    finally:
+        state_cache.finish("balance", address, future, result)
+
+
+def _balance_view(state: Dict) -> Dict:
+    """get_wallet_balance's answer from a cached or shared balance or walletStates read"""
+    if not state["success"]:
+        return state
+    return {key: state[key] for key in ("success", "balance_ton", "balance_nano", "status", "data")}
+
+
+async def _fetch_wallet_balance(address: str) -> Dict:
+    """One addressInformation request"""
+    try:
+        status_code, data = await api_request("GET", "/addressInformation", params={"address": address})
+        if status_code == 200:
+            # Parse balance and status
+            balance_nano = data.get("balance", "0")
+            balance_ton = float(balance_nano) / 1_000_000_000  # Convert nanoTON to TON
+            status = data.get("status", "unknown")
+            
+            return {
+                "success": True,
+                "balance_ton": balance_ton,
+                "balance_nano": balance_nano,
+                "status": status,
+                "data": data
+            }
+        else:
+            return {
+                "success": False,
+                "error": f"API Error: {status_code}",
+                "response_text": data
+            }
                     
     except Exception as e:
         return {
@@ -159,6 +908,210 @@ async def get_wallet_balance(address: str) -> Dict:
         }
 
 
+def _raw_address(address: str) -> str:
+    """Normalize any address form to lowercase raw form (wc:hex) for matching API results"""
+    return Address(address).to_string(False).lower()
+
+
+async def _get_wallet_states_chunk(addresses: List[str]) -> Dict[str, Dict]:
+    """Fetch balance, status and seqno for one batch of addresses"""
+    try:
+        status_code, data = await api_request("GET", "/walletStates", params={"address": addresses})
+        if status_code != 200:
+            error = {"success": False, "error": f"API Error: {status_code}", "response_text": data}
+            return {address: error for address in addresses}
+
+        by_raw = {_raw_address(wallet["address"]): wallet for wallet in data.get("wallets", [])}
+        states = {}
+        for address in addresses:
+            # Accounts that were never touched are not returned at all
+            wallet = by_raw.get(_raw_address(address), {})
+            balance_nano = wallet.get("balance", "0")
+            states[address] = {
+                "success": True,
+                "balance_ton": float(balance_nano) / 1_000_000_000,
+                "balance_nano": balance_nano,
+                "status": wallet.get("status", "uninit"),
+                "seqno": wallet.get("seqno") or 0,
+                "last_transaction_lt": wallet.get("last_transaction_lt"),
+                "data": wallet
+            }
+            seqno_tracker.observe(address, states[address]["seqno"])
+        return states
+
+    except Exception as e:
+        error = {"success": False, "error": f"Exception: {str(e)}"}
+        return {address: error for address in addresses}
+
+
+@instrumented("get_wallet_states")
+async def get_wallet_states(addresses: List[str], fresh: bool = False) -> Dict[str, Dict]:
+    """Get balance, status and seqno for many addresses using batched walletStates requests.
+
+    Fresh cached states are reused and addresses another call is already fetching are awaited, unless
+    fresh is set (pollers waiting for a change); the states read here are cached either way.
+    """
+    states = {}
+    shared = {}
+    missing = []
+    for address in dict.fromkeys(addresses):
+        cached = None if fresh else state_cache.get(address, need_seqno=True)
+        future = None if fresh or cached is not None else state_cache.in_flight("state", address)
+        if cached is not None:
+            states[address] = cached
+        elif future is not None:
+            shared[address] = future
+        else:
+            missing.append(address)
+    metrics.state_reads.inc(len(states), source="cache")
+    metrics.state_reads.inc(len(missing), source="network")
+
+    futures = {address: state_cache.start("state", address) for address in missing}
+    try:
+        chunks = [missing[i:i + STATE_BATCH_SIZE] for i in range(0, len(missing), STATE_BATCH_SIZE)]
+        for chunk_states in await run_bounded(_get_wallet_states_chunk, chunks, read_limit.limit):
+            for address, state in chunk_states.items():
+                state_cache.put(address, state)
+                states[address] = state
+    finally:
+        for address, future in futures.items():
+            state_cache.finish("state", address, future, states.get(address))
+
+    for address, future in shared.items():
+        state = await asyncio.shield(future)
+        if state is None:  # the read we joined was abandoned
+            state = (await _get_wallet_states_chunk([address]))[address]
+        else:
+            metrics.state_reads.inc(source="shared")
+        states[address] = state
+    return states
+
+
+def explorer_link(tx_hash: str) -> str:
+    """Tonviewer link of a transaction given its base64 hash"""
+    try:
+        return f"https://tonviewer.com/transaction/{base64.b64decode(tx_hash).hex()}"
+    except Exception:
+        return "N/A"
+
+
+def _transaction_info(tx: Dict) -> Dict:
+    """The outcome of an indexed transaction: hash, success, fees and whether it bounced"""
+    description = tx.get("description") or {}
+    compute = description.get("compute_ph") or {}
+    action = description.get("action") or {}
+    return {
+        "hash": tx["hash"],
+        "lt": int(tx["lt"]),
+        "success": not description.get("aborted", False) and compute.get("success", False)
+                   and action.get("success", True),
+        "exit_code": compute.get("exit_code"),
+        "fees_ton": int(tx.get("total_fees") or 0) / 1_000_000_000,
+        "bounced": bool(description.get("bounce")),
+        "explorer_link": explorer_link(tx["hash"])
+    }
+
+
+async def _get_transaction_by_message(message_hash: str) -> Dict:
+    """Look up the transaction of one inbound message hash (transactionsByMessage takes one msg_hash per call)"""
+    try:
+        status_code, data = await api_request(
+            "GET", "/transactionsByMessage", params={"msg_hash": message_hash, "direction": "in"}
+        )
+        if status_code != 200:
+            return {"success": False, "error": f"API Error: {status_code}"}
+
+        for tx in data.get("transactions", []):
+            in_msg = tx.get("in_msg") or {}
+            # Newer indexers also return the normalized hash of external messages
+            if message_hash in (in_msg.get("hash"), in_msg.get("hash_norm")):
+                return {"success": True, "transaction": _transaction_info(tx)}
+        # A message that is not indexed yet has no transaction: pending, not an error
+        return {"success": True, "transaction": None}
+
+    except Exception as e:
+        return {"success": False, "error": f"Exception: {str(e)}"}
+
+
+@instrumented("get_transactions_by_message")
+async def get_transactions_by_message(hashes: List[str]) -> Dict[str, Dict]:
+    """Find the transactions created by many sent messages (base64 hashes), one request per hash under the read limit"""
+    results = await run_bounded(_get_transaction_by_message, hashes, read_limit.limit)
+    return dict(zip(hashes, results))
+
+
+async def _get_account_lts_chunk(addresses: List[str]) -> Dict[str, Dict]:
+    """Fetch only the last transaction lt of one batch of accounts (accountStates without code or data)"""
+    try:
+        status_code, data = await api_request(
+            "GET", "/accountStates", params={"address": addresses, "include_boc": "false"}
+        )
+        if status_code != 200:
+            error = {"success": False, "error": f"API Error: {status_code}"}
+            return {address: error for address in addresses}
+
+        by_raw = {_raw_address(account["address"]): account for account in data.get("accounts", [])}
+        lts = {}
+        for address in addresses:
+            lt = by_raw.get(_raw_address(address), {}).get("last_transaction_lt")
+            lts[address] = {"success": True, "last_transaction_lt": int(lt) if lt is not None else None}
+        return lts
+
+    except Exception as e:
+        error = {"success": False, "error": f"Exception: {str(e)}"}
+        return {address: error for address in addresses}
+
+
+async def _get_changed_wallet_states_chunk(addresses: List[str], known: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Fetch full state only for accounts whose last transaction lt moved since the known one; reuse the rest"""
+    lts = await _get_account_lts_chunk(addresses)
+    stale = [
+        address for address in addresses
+        if address not in known or not lts[address]["success"]
+        or lts[address]["last_transaction_lt"] != known[address]["last_transaction_lt"]
+    ]
+    states = await _get_wallet_states_chunk(stale) if stale else {}
+    for address in addresses:
+        if address not in states:
+            # No transaction since the known state, so balance, status and seqno are unchanged
+            row = known[address]
+            lt = row["last_transaction_lt"]
+            states[address] = {
+                "success": True,
+                "balance_ton": row["balance_nano"] / 1_000_000_000,
+                "balance_nano": str(row["balance_nano"]),
+                "status": row["status"],
+                "seqno": row["seqno"],
+                "last_transaction_lt": str(lt) if lt is not None else None,
+                "cached": True
+            }
+    return states
+
+
+async def iter_wallet_states(addresses: List[str],
+                             known: Optional[Dict[str, Dict]] = None) -> AsyncIterator[Tuple[List[str], Dict[str, Dict]]]:
+    """Like get_wallet_states, but yield (batch addresses, states) in order as soon as each batch arrives.
+
+    With known states (address -> balance_nano, status, seqno, last_transaction_lt), each batch first asks
+    which accounts changed and only fetches those; unchanged ones are returned with "cached": True.
+    """
+    # All batches are requested up front; api_request's read limit bounds how many are in flight
+    tasks = [
+        asyncio.ensure_future(
+            _get_wallet_states_chunk(addresses[i:i + STATE_BATCH_SIZE]) if known is None
+            else _get_changed_wallet_states_chunk(addresses[i:i + STATE_BATCH_SIZE], known)
+        )
+        for i in range(0, len(addresses), STATE_BATCH_SIZE)
+    ]
+    try:
+        for i, task in enumerate(tasks):
+            yield addresses[i * STATE_BATCH_SIZE:(i + 1) * STATE_BATCH_SIZE], await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@instrumented("create_transfer_transaction")
 async def create_transfer_transaction(wallet, to_address: str, amount_ton: float, seqno: int) -> Optional[str]:
     """Create transfer transaction and return BOC"""
     try:
@@ -180,19 +1133,84 @@ async def create_transfer_transaction(wallet, to_address: str, amount_ton: float
         raise Exception(f"Failed to create transaction: {str(e)}")
 
 
-async def await_seqno_increment(address: str, initial_seqno: int, timeout: int = 60) -> bool:
-    """Waits for the wallet's seqno to increment, confirming a transaction."""
-    start_time = asyncio.get_event_loop().time()
-    while True:
-        # Check for timeout
-        if asyncio.get_event_loop().time() - start_time > timeout:
-            print(f"  ⏳ Timeout waiting for transaction confirmation.")
-            return False
-
-        # Get the latest seqno
-        seqno_result = await get_wallet_seqno(address)
-        if seqno_result["success"] and seqno_result["seqno"] > initial_seqno:
-            return True
+@instrumented("create_multi_transfer_transaction")
+async def create_multi_transfer_transaction(wallet, transfers: List[Tuple[str, float]], seqno: int) -> Optional[str]:
+    """Create one signed message carrying up to V4_MAX_MESSAGES transfers and return BOC"""
+    try:
+        if not 0 < len(transfers) <= V4_MAX_MESSAGES:
+            raise ValueError(f"A v4 wallet message carries 1-{V4_MAX_MESSAGES} transfers, got {len(transfers)}")
         
-        # Wait before checking again
-        await asyncio.sleep(2)
+        signing_message = wallet.create_signing_message(seqno)
+        for to_address, amount_ton in transfers:
+            amount_nanoton = int(amount_ton * 1_000_000_000)  # Convert TON to nanoTON
+            order_header = Contract.create_internal_message_header(
+                Address(to_address), decimal.Decimal(amount_nanoton)
+            )
+            order = Contract.create_common_msg_info(order_header, None, Cell())  # Empty payload
+            # Pay fees separately and ignore errors, so one failing transfer does not void the others
+            signing_message.bits.write_uint8(3)
+            signing_message.refs.append(order)
+        
+        transfer = wallet.create_external_message(signing_message, seqno)
+        boc = bytes_to_b64str(transfer["message"].to_boc(False))
+        return boc
+        
+    except Exception as e:
+        raise Exception(f"Failed to create transaction: {str(e)}")
+
+
+def message_hash(boc: str) -> str:
+    """Base64 hash of a signed external message, the form toncenter returns as message_hash"""
+    return bytes_to_b64str(Cell.one_from_boc(b64str_to_bytes(boc)).bytes_hash())
+
+
+class SignedMessage:
+    """A signed wallet message kept across send retries.
+
+    A retry first looks the message up by hash, then rebroadcasts the same BOC until it expires;
+    only a message that is still missing MESSAGE_INDEX_GRACE seconds after expiry is re-signed,
+    so one seqno never gets two messages.
+    """
+
+    def __init__(self, address: str, seqno: int, boc: str):
+        self.address = address
+        self.seqno = seqno
+        self.boc = boc
+        self.hash = message_hash(boc)
+        self.expires_at = float("inf") if seqno == 0 else time.time() + V4_MESSAGE_TTL
+        self.broadcast = False  # some send may have reached the network
+        self.refused = False  # /message explicitly rejected the last send
+
+    def record_send(self, result: Dict) -> None:
+        """Note a send attempt; anything but an explicit rejection may have been broadcast"""
+        self.refused = bool(result.get("rejected"))
+        if not self.refused:
+            self.broadcast = True
+
+    def landed(self) -> None:
+        """The message was included (successful or not), so its seqno is used up"""
+        seqno_tracker.observe(self.address, self.seqno + 1)
+
+    async def recheck(self, wait: bool = False) -> Dict:
+        """Look the message up by hash: included (with its transaction), pending while it can still land, else expired.
+
+        The wallet's seqno is no proof of inclusion, as another message may have used it. wait keeps
+        polling a pending message until it shows up or expires (at most V4_MESSAGE_TTL plus the grace).
+        """
+        deadline = min(self.expires_at, time.time() + V4_MESSAGE_TTL) + MESSAGE_INDEX_GRACE
+        while True:
+            found = (await get_transactions_by_message([self.hash]))[self.hash]
+            if not found["success"]:
+                return found
+            if found["transaction"] is not None:
+                state = "included"
+            elif time.time() >= self.expires_at + MESSAGE_INDEX_GRACE:
+                state = "expired"
+            elif wait and time.time() < deadline:
+                await asyncio.sleep(2)
+                continue
+            else:
+                state = "pending"
+            break
+        metrics.message_retries.inc(outcome={"included": "already_included", "pending": "rebroadcast"}.get(state, "resigned"))
+        return {"success": True, "state": state, "transaction": found["transaction"]}
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from src.exporters import ArrowExporter, JsonlExporter, EXPORT_FIELDS
+
+
+ROWS = [
+    {"index": 1, "address": "UQD2PC53RcwuPTll9DHcoP8hmwyCBWw6ZtXzIv3nLjp_0RJB", "balance_nano": 98_000_000_000,
+     "status": "active", "seqno": 7, "last_transaction_lt": 48_000_000_000_001},
+    {"index": 2, "address": "UQATnlK7Rj-_1nqZaiNf7gPKrWcEzZtfCnspuA45pkVFa1W1", "balance_nano": 1_038_517_000,
+     "status": "uninit", "seqno": 0, "last_transaction_lt": 48_000_000_000_002},
+    {"index": 3, "address": "UQDPwPG57au8goWVofWgdv40Z9Whn7WS2o8KOXb_7ZHYrxxZ", "balance_nano": 0,
+     "status": "nonexist", "seqno": 0, "last_transaction_lt": None},
+]
+
+
+def _scan(exporter):
+    for row in ROWS:
+        exporter.write(row)
+    exporter.close()
+    return exporter.rows_written
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = tmp_path / "wallets.jsonl"
+    assert _scan(JsonlExporter(str(path), batch_size=2)) == len(ROWS)
+    assert [json.loads(line) for line in path.read_text().splitlines()] == ROWS
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_arrow_round_trip(tmp_path, file_format):
+    pa = pytest.importorskip("pyarrow")
+    path = tmp_path / f"wallets.{file_format}"
+    # batch_size 2 writes two batches (row groups / record batches)
+    assert _scan(ArrowExporter(str(path), file_format, batch_size=2)) == len(ROWS)
+
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(str(path))
+    else:
+        import pyarrow.ipc
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+    assert table.column_names == EXPORT_FIELDS
+    assert table.to_pylist() == ROWS
+
+
+def test_abort_removes_the_partial_export(tmp_path):
+    path = tmp_path / "wallets.jsonl"
+    exporter = JsonlExporter(str(path), batch_size=2)
+    for row in ROWS:
+        exporter.write(row)
+    exporter.abort()
+    assert not path.exists()
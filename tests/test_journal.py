@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from src import journal as journal_module
+from src.journal import RunJournal
+
+
+@pytest.fixture
+def journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "JOURNAL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _write_journal(path, events):
+    path.write_text("".join(json.dumps(event) + "\n" for event in events))
+
+
+def test_load_replays_the_last_event_per_operation(journal_dir):
+    _write_journal(journal_dir / "disperse-test.jsonl", [
+        {"event": "run", "run_id": "disperse-test", "command": "disperse", "params": {"plan_seed": 7}, "t": 1},
+        {"event": "planned", "op": "disperse", "keys": ["a"], "amount": 1.0, "t": 2},
+        {"event": "planned", "op": "disperse", "keys": ["b"], "amount": 2.0, "t": 2},
+        {"event": "planned", "op": "disperse", "keys": ["c"], "amount": 3.0, "t": 2},
+        {"event": "sent", "op": "disperse", "keys": ["a", "b"], "wallet": "w", "seqno": 4, "t": 3},
+        {"event": "confirmed", "op": "disperse", "keys": ["a", "b"], "t": 4},
+        {"event": "sent", "op": "disperse", "keys": ["c"], "wallet": "w", "seqno": 5, "t": 5},
+    ])
+    journal = RunJournal.load("disperse-test")
+
+    assert journal.command == "disperse"
+    assert journal.params == {"plan_seed": 7}
+    assert journal.status("disperse", "a") == "confirmed"
+    assert journal.status("disperse", "c") == "sent"
+    assert journal.status("disperse", "d") is None
+    assert journal.is_settled("disperse", "c")
+    assert journal.count("confirmed") == 2
+
+
+def test_load_ignores_a_torn_last_line(journal_dir):
+    path = journal_dir / "collect-test.jsonl"
+    _write_journal(path, [
+        {"event": "run", "run_id": "collect-test", "command": "collect", "params": {}, "t": 1},
+        {"event": "sent", "op": "collect", "keys": ["a"], "wallet": "a", "seqno": 1, "t": 2},
+    ])
+    with open(path, "a") as f:
+        f.write('{"event": "confirmed", "op": "coll')
+
+    journal = RunJournal.load("collect-test")
+    assert journal.status("collect", "a") == "sent"
+
+
+def test_load_rejects_missing_and_foreign_files(journal_dir):
+    with pytest.raises(FileNotFoundError):
+        RunJournal.load("nope")
+    _write_journal(journal_dir / "other.jsonl", [{"event": "planned", "op": "x", "keys": ["a"]}])
+    with pytest.raises(ValueError):
+        RunJournal.load("other")
+
+
+def test_in_doubt_lists_each_sent_message_once(journal_dir):
+    journal = RunJournal.create("disperse", wallets_file="wallets.txt")
+    journal.planned("disperse", [("a", 1.0), ("b", 1.0), ("c", 1.0), ("d", 1.0)])
+    journal.sent("disperse", ["a", "b", "c"], "w", seqno=1, message_hash="h1")
+    journal.sent("disperse", ["d"], "w", seqno=2, message_hash="h2")
+    journal.confirmed("disperse", ["d"])
+    journal.close()
+
+    for replayed in (journal, RunJournal.load(journal.run_id)):
+        in_doubt = replayed.in_doubt()
+        assert len(in_doubt) == 1
+        assert in_doubt[0]["keys"] == ["a", "b", "c"]
+        assert in_doubt[0]["message_hash"] == "h1"
+
+
+def test_a_later_event_moves_an_operation_out_of_doubt():
+    journal = RunJournal("unused.jsonl", {"event": "run", "run_id": "x", "command": "deploy", "params": {}})
+    journal._apply({"event": "sent", "op": "activate", "keys": ["a"], "wallet": "a", "seqno": 0})
+    assert journal.in_doubt()
+    journal._apply({"event": "failed", "op": "activate", "keys": ["a"], "error": "expired"})
+    assert journal.in_doubt() == []
+    assert not journal.is_settled("activate", "a")
@@ -0,0 +1,31 @@
+import math
+
+from src.metrics import Histogram
+
+
+def test_quantile_interpolates_inside_the_bucket():
+    histogram = Histogram("test_quantile_seconds", "test", buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 0.5, 1.5, 1.5):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.75) == 1.5
+    assert histogram.quantile(1.0) == 2.0
+
+
+def test_quantile_in_the_overflow_bucket_returns_the_highest_bound():
+    histogram = Histogram("test_quantile_overflow_seconds", "test", buckets=(1.0, 2.0))
+    histogram.observe(0.5)
+    histogram.observe(10.0)
+    assert histogram.quantile(0.99) == 2.0
+    assert histogram.buckets[-1] == math.inf
+
+
+def test_quantile_per_label_set():
+    histogram = Histogram("test_quantile_labelled_seconds", "test", ("endpoint",), buckets=(1.0, 2.0))
+    histogram.observe(0.5, endpoint="/wallet")
+    histogram.observe(1.5, endpoint="/message")
+
+    assert histogram.quantile(0.5, endpoint="/wallet") == 0.5
+    assert histogram.quantile(0.5, endpoint="/message") == 1.5
+    assert histogram.quantile(0.5, endpoint="/other") is None
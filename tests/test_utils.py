@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+from tonsdk.boc import Cell
+from tonsdk.utils import bytes_to_b64str
+
+from src import utils
+from src.utils import MESSAGE_INDEX_GRACE, RateLimiter, SignedMessage
+
+
+def test_rate_limiter_serves_the_burst_at_once_then_paces():
+    limiter = RateLimiter(rate=20, burst=3)
+
+    async def take(count):
+        started = time.monotonic()
+        for _ in range(count):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(take(3)) < 0.05
+    # The next two tokens refill at 20/s
+    assert asyncio.run(take(2)) >= 0.08
+
+
+def test_rate_limiter_pauses_and_slows_down_after_a_429():
+    limiter = RateLimiter(rate=10, burst=5)
+    limiter.on_throttled(0.1)
+    assert limiter.rate == pytest.approx(7.0)
+
+    started = time.monotonic()
+    asyncio.run(limiter.acquire())
+    assert time.monotonic() - started >= 0.1
+
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(7.2)
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 10
+
+
+def _signed(seqno):
+    cell = Cell()
+    cell.bits.write_uint(seqno, 32)
+    return SignedMessage("UQD2PC53RcwuPTll9DHcoP8hmwyCBWw6ZtXzIv3nLjp_0RJB", seqno, bytes_to_b64str(cell.to_boc(False)))
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Queue of get_transactions_by_message answers for the message under test (the last one repeats)"""
+    answers = []
+
+    async def fake_lookup(hashes):
+        answer = answers.pop(0) if len(answers) > 1 else answers[0]
+        return {message_hash: answer for message_hash in hashes}
+
+    async def no_sleep(_delay):
+        pass
+
+    monkeypatch.setattr(utils, "get_transactions_by_message", fake_lookup)
+    monkeypatch.setattr(utils.asyncio, "sleep", no_sleep)
+    return answers
+
+
+TRANSACTION = {"hash": "tx", "success": True}
+MISSING = {"success": True, "transaction": None}
+
+
+def test_recheck_included(lookups):
+    lookups.append({"success": True, "transaction": TRANSACTION})
+    result = asyncio.run(_signed(3).recheck())
+    assert result["state"] == "included"
+    assert result["transaction"] == TRANSACTION
+
+
+def test_recheck_pending_until_expiry_plus_grace(lookups):
+    lookups.append(MISSING)
+    signed = _signed(3)
+    assert asyncio.run(signed.recheck())["state"] == "pending"
+
+    signed.expires_at = time.time() - MESSAGE_INDEX_GRACE / 2
+    assert asyncio.run(signed.recheck())["state"] == "pending"
+
+    signed.expires_at = time.time() - MESSAGE_INDEX_GRACE - 1
+    assert asyncio.run(signed.recheck())["state"] == "expired"
+
+
+def test_recheck_seqno_zero_never_expires(lookups):
+    lookups.append(MISSING)
+    signed = _signed(0)
+    assert signed.expires_at == float("inf")
+    assert asyncio.run(signed.recheck())["state"] == "pending"
+
+
+def test_recheck_wait_polls_until_the_message_shows_up(lookups):
+    lookups.extend([MISSING, MISSING, {"success": True, "transaction": TRANSACTION}])
+    assert asyncio.run(_signed(3).recheck(wait=True))["state"] == "included"
+
+
+def test_recheck_passes_lookup_errors_through(lookups):
+    lookups.append({"success": False, "error": "API Error: 500"})
+    assert asyncio.run(_signed(3).recheck()) == {"success": False, "error": "API Error: 500"}
+
+
+def test_seqno_tracker_evicts_expired_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(utils.time, "monotonic", lambda: now[0])
+    tracker = utils.SeqnoTracker(ttl=30)
+    tracker.observe("a", 5)
+    tracker.observe("b", 1)
+    tracker.observe("a", 4)
+    assert tracker._seqnos["a"][0] == 5
+
+    now[0] += 31
+    tracker.observe("c", 2)
+    assert list(tracker._seqnos) == ["c"]
+
+
+def test_run_bounded_keeps_order_and_cancels_the_rest_on_error():
+    async def double(item):
+        await asyncio.sleep(0.01 * (3 - item % 3))
+        return item * 2
+
+    assert asyncio.run(utils.run_bounded(double, range(7), 3)) == [0, 2, 4, 6, 8, 10, 12]
+
+    finished = []
+
+    async def fail_on_first(item):
+        if item == 0:
+            raise ValueError("boom")
+        await asyncio.sleep(0.05)
+        finished.append(item)
+
+    async def run():
+        with pytest.raises(ValueError):
+            await utils.run_bounded(fail_on_first, range(4), 2)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert finished == []